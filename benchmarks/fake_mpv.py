@@ -0,0 +1,381 @@
+"""
+fake_mpv.py
+
+In-process stand-in for mpv's JSON IPC server, so Player and QueueManager
+can be exercised without mpv or audio hardware.
+
+It keeps a playlist and answers the commands musicli sends (loadfile,
+loadlist, playlist-move, playlist-remove, playlist-next/prev, set_property,
+get_property, observe_property, enable_event/disable_event), pushing
+property-change, start-file and end-file events like mpv does. Replies can
+be delayed and randomly dropped, and the end of the current track can be
+simulated, to stress timing-sensitive code.
+
+Usage:
+    server = FakeMpv(player.ipc_socket, latency=0.001, drop_rate=0.01) # after creating the Player
+    server.start()
+    server.attach(player)               # player.process becomes a stand-in
+    ...
+    server.finish_current()             # the current track reaches its end
+"""
+import json
+import os
+import random
+import socket
+import threading
+import time
+
+
+class FakeProcess:
+    """Stand-in for the mpv subprocess.Popen held by Player.process."""
+
+    def __init__(self, server:"FakeMpv"):
+        self.server = server
+
+    # no pid: Player.stop() falls back to terminate() instead of killing a process group
+    def poll(self):
+        return None if self.server.running else 0
+
+    def terminate(self):
+        self.server.stop()
+
+    kill = terminate
+
+    def wait(self, timeout=None):
+        return 0
+
+
+class _Client:
+    """One IPC connection."""
+
+    def __init__(self, conn:socket.socket):
+        self.conn = conn
+        self.observed: dict[str, int] = {} # property name -> observe id
+        self.disabled_events: set[str] = set() # "all" disables every event not re-enabled
+        self.enabled_events: set[str] = set()
+        self._write_lock = threading.Lock()
+
+    def wants(self, event:str) -> bool:
+        if event in self.enabled_events:
+            return True
+        return "all" not in self.disabled_events and event not in self.disabled_events
+
+    def send(self, obj:dict) -> None:
+        data = (json.dumps(obj) + "\n").encode("utf-8")
+        with self._write_lock:
+            try:
+                self.conn.sendall(data)
+            except OSError:
+                pass
+
+
+class FakeMpv:
+    """Fake mpv JSON IPC server listening on a UNIX socket."""
+
+    def __init__(self, path:str, latency:float=0.0, drop_rate:float=0.0, seed:int|None=None):
+        """
+        path: socket path (the Player's ipc_socket)
+        latency: seconds spent on each command before it is applied and answered
+        drop_rate: probability that a command is applied but never answered
+        seed: seed of the dropped replies
+        """
+        self.path = path
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.running = False
+        self.commands = 0 # commands received
+        self.dropped_replies = 0
+        self._random = random.Random(seed)
+
+        self._lock = threading.RLock()
+        self.playlist: list[str] = []
+        self.pos: int|None = None
+
+        self._clients: list[_Client] = []
+        self._sock: socket.socket|None = None
+        self._thread: threading.Thread|None = None
+
+    # -------------------------
+    # server
+    # -------------------------
+    def start(self) -> None:
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self.path)
+        self._sock.listen(8)
+        self.running = True
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self.running = False
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            try:
+                client.conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.conn.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def attach(self, player) -> None:
+        """Make player believe mpv is running (call after start())."""
+        player.process = FakeProcess(self)
+
+    def _accept_loop(self) -> None:
+        while self.running:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            client = _Client(conn)
+            with self._lock:
+                self._clients.append(client)
+            threading.Thread(target=self._client_loop, args=(client,), daemon=True).start()
+
+    def _client_loop(self, client:_Client) -> None:
+        buf = b""
+        while self.running:
+            try:
+                data = client.conn.recv(65536)
+            except OSError:
+                break
+            if not data:
+                break
+            buf += data
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    self._handle(client, line)
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def _handle(self, client:_Client, line:bytes) -> None:
+        try:
+            msg = json.loads(line)
+            command = msg["command"]
+            handler = getattr(self, "_cmd_" + str(command[0]).replace("-", "_"))
+        except (ValueError, KeyError, IndexError, TypeError):
+            client.send({"error": "invalid parameter", "request_id": 0})
+            return
+        except AttributeError:
+            client.send({"error": "invalid parameter", "request_id": msg.get("request_id", 0)})
+            return
+
+        self.commands += 1
+        if self.latency:
+            # commands of a connection are processed in order, like mpv does
+            time.sleep(self.latency)
+        try:
+            data = handler(client, *command[1:])
+            reply = {"data": data, "error": "success"}
+        except (ValueError, IndexError, TypeError, OSError) as e:
+            reply = {"error": str(e) or "error"}
+        reply["request_id"] = msg.get("request_id", 0)
+
+        if self.drop_rate and self._random.random() < self.drop_rate:
+            self.dropped_replies += 1
+            return
+        client.send(reply)
+
+    # -------------------------
+    # properties & events
+    # -------------------------
+    def _property(self, name:str):
+        with self._lock:
+            match name:
+                case "playlist-count":
+                    return len(self.playlist)
+                case "playlist-pos":
+                    return self.pos if self.pos is not None else -1
+                case "playlist":
+                    return [
+                        {"filename": f, "id": i + 1, **({"current": True, "playing": True} if i == self.pos else {})}
+                        for i, f in enumerate(self.playlist)
+                    ]
+                case "idle-active":
+                    return self.pos is None
+                case "path":
+                    return self.playlist[self.pos] if self.pos is not None else None
+        raise ValueError("property not found")
+
+    def _broadcast(self, obj:dict) -> None:
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            if client.wants(obj["event"]):
+                client.send(obj)
+
+    def _changed(self, *names:str) -> None:
+        """Push property-change events for observed properties."""
+        with self._lock:
+            clients = list(self._clients)
+            values = {name: self._property(name) for name in names}
+        for client in clients:
+            for name in names:
+                if name in client.observed and client.wants("property-change"):
+                    client.send({"event": "property-change", "id": client.observed[name], "name": name, "data": values[name]})
+
+    def _play(self, pos:int|None, reason:str="stop") -> None:
+        """Stop the current entry (end-file) and start the one at pos, or go idle if None."""
+        with self._lock:
+            previous = self.pos
+            self.pos = pos
+        if previous is not None:
+            self._broadcast({"event": "end-file", "reason": reason, "playlist_entry_id": previous + 1})
+        if pos is not None:
+            self._broadcast({"event": "start-file", "playlist_entry_id": pos + 1})
+
+    def finish_current(self) -> None:
+        """Simulate the end of the current track: play the next entry, or go idle."""
+        with self._lock:
+            if self.pos is None:
+                return
+            nxt = self.pos + 1 if self.pos + 1 < len(self.playlist) else None
+        self._play(nxt, reason="eof")
+        self._changed("playlist-pos", "playlist")
+
+    # -------------------------
+    # commands
+    # -------------------------
+    def _cmd_disable_event(self, client:_Client, name:str):
+        if name == "all":
+            client.enabled_events.clear()
+        client.enabled_events.discard(name)
+        client.disabled_events.add(name)
+
+    def _cmd_enable_event(self, client:_Client, name:str):
+        if name == "all":
+            client.disabled_events.clear()
+        client.disabled_events.discard(name)
+        client.enabled_events.add(name)
+
+    def _cmd_observe_property(self, client:_Client, observe_id:int, name:str):
+        client.observed[name] = observe_id
+        # mpv reports the current value right away
+        client.send({"event": "property-change", "id": observe_id, "name": name, "data": self._property(name)})
+
+    def _cmd_get_property(self, client:_Client, name:str):
+        return self._property(name)
+
+    def _cmd_set_property(self, client:_Client, name:str, value):
+        if name != "playlist-pos":
+            raise ValueError("property not found")
+        with self._lock:
+            if not 0 <= int(value) < len(self.playlist):
+                raise ValueError("invalid value")
+        self._play(int(value))
+        self._changed("playlist-pos", "playlist")
+
+    def _cmd_loadfile(self, client:_Client, url:str, mode:str="replace", index=None):
+        with self._lock:
+            start = None
+            match mode:
+                case "replace":
+                    self.playlist = [url]
+                    start = 0
+                case "append":
+                    self.playlist.append(url)
+                case "append-play":
+                    self.playlist.append(url)
+                    if self.pos is None:
+                        start = len(self.playlist) - 1
+                case "insert-at" | "insert-at-play":
+                    idx = min(max(0, int(index)), len(self.playlist))
+                    self.playlist.insert(idx, url)
+                    if self.pos is not None and idx <= self.pos:
+                        self.pos += 1
+                    if mode == "insert-at-play":
+                        start = idx
+                case _:
+                    raise ValueError("invalid parameter")
+        if start is not None:
+            self._play(start)
+        self._changed("playlist-count", "playlist-pos", "playlist")
+
+    def _cmd_loadlist(self, client:_Client, path:str, mode:str="replace"):
+        with open(path, "r", encoding="utf-8") as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        with self._lock:
+            if mode == "replace":
+                self.playlist = urls
+            else:
+                self.playlist.extend(urls)
+        if mode == "replace":
+            self._play(0 if urls else None)
+        self._changed("playlist-count", "playlist-pos", "playlist")
+
+    def _cmd_playlist_move(self, client:_Client, index1, index2):
+        """Move the entry at index1 to the place of the entry at index2 (mpv semantics)."""
+        with self._lock:
+            i, j = int(index1), int(index2)
+            if not 0 <= i < len(self.playlist) or not 0 <= j <= len(self.playlist):
+                raise ValueError("invalid parameter")
+            current = self.playlist[self.pos] if self.pos is not None else None
+            pos = self.pos
+            item = self.playlist.pop(i)
+            if j > i:
+                j -= 1
+            self.playlist.insert(j, item)
+            if pos is not None:
+                # the current entry keeps playing wherever it moved
+                if pos == i:
+                    self.pos = j
+                else:
+                    if i < pos:
+                        pos -= 1
+                    if j <= pos:
+                        pos += 1
+                    self.pos = pos
+        self._changed("playlist-pos", "playlist")
+
+    def _cmd_playlist_remove(self, client:_Client, index):
+        with self._lock:
+            i = self.pos if index == "current" else int(index)
+            if i is None or not 0 <= i < len(self.playlist):
+                raise ValueError("invalid parameter")
+            self.playlist.pop(i)
+            removed_current = i == self.pos
+            if self.pos is not None and i < self.pos:
+                self.pos -= 1
+        if removed_current:
+            # the entry now at the same index (if any) is played next
+            self._play(i if i < len(self.playlist) else None)
+        self._changed("playlist-count", "playlist-pos", "playlist")
+
+    def _cmd_playlist_next(self, client:_Client, flags:str="weak"):
+        with self._lock:
+            if self.pos is None or self.pos + 1 >= len(self.playlist):
+                raise ValueError("error running command")
+            nxt = self.pos + 1
+        self._play(nxt)
+        self._changed("playlist-pos", "playlist")
+
+    def _cmd_playlist_prev(self, client:_Client, flags:str="weak"):
+        with self._lock:
+            if not self.pos:
+                raise ValueError("error running command")
+            prev = self.pos - 1
+        self._play(prev)
+        self._changed("playlist-pos", "playlist")
+
+    def _cmd_stop(self, client:_Client, *flags):
+        with self._lock:
+            self.playlist = []
+        self._play(None)
+        self._changed("playlist-count", "playlist-pos", "playlist")
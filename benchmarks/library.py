@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+library.py
+
+Measure how the library and queue paths scale with the library size.
+
+For each size, a synthetic library is generated (empty files spread over
+many playlists, mixed extensions, non-audio and hidden files, a hidden
+playlist), then these are timed:
+    - Library.get_playlists (cold: first scan, warm: index up to date)
+    - Library.get_tracks of the largest playlist
+    - Library.select_track, with fzf replaced by a stand-in reading every option
+    - QueueManager.load_queue of the largest playlist, against fake_mpv
+    - QueueManager.sync_from_mpv
+A throwaway config directory is used so the user's settings are never
+touched. Results are printed as JSON.
+
+Usage:
+    python benchmarks/library.py [--sizes 1000,10000,100000] [--repeat N]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+SRC = BENCH.parent / "src"
+
+_AUDIO = ("mp3", "flac", "opus", "m4a", "wav")
+_OTHER = ("jpg", "txt", "nfo")
+_WORDS = "alpha beta gamma delta echo foxtrot golf hotel india juliet kilo lima mike".split()
+
+
+def generate_library(root:str, files:int, seed:int=0) -> dict:
+    """Create files empty files in root; returns a description of the library."""
+    rng = random.Random(seed)
+    playlists = max(10, files // 1000)
+    os.makedirs(root, exist_ok=True)
+    names = [f"playlist {i:04d}" for i in range(playlists)] + [".hidden playlist"]
+    for name in names:
+        os.makedirs(os.path.join(root, name), exist_ok=True)
+
+    # playlist sizes are skewed so one playlist is much larger than the others
+    weights = [1.0 / (i + 1) for i in range(len(names))]
+    counts = dict.fromkeys(names, 0)
+    for i in range(files):
+        playlist = rng.choices(names, weights)[0]
+        counts[playlist] += 1
+        roll = rng.random()
+        if roll < 0.05:
+            ext = rng.choice(_OTHER)
+        else:
+            ext = rng.choice(_AUDIO)
+        title = " ".join(rng.choice(_WORDS) for _ in range(3))
+        prefix = "." if roll > 0.98 else ""
+        open(os.path.join(root, playlist, f"{prefix}{title} {i}.{ext}"), "w").close()
+
+    largest = max(counts, key=counts.get)
+    return {"files": files, "playlists": len(names), "largest_playlist": largest, "largest_files": counts[largest]}
+
+
+def timed(fn, repeat:int=1) -> dict:
+    """Run fn repeat times; return the median/min duration in seconds and the last result."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(durations), "min_s": min(durations)}, result
+
+
+def bench_size(files:int, workdir:str, repeat:int) -> dict:
+    # imported here: Settings reads XDG_CONFIG_HOME when it is first imported
+    import library as library_mod
+    from settings import Settings
+    from player import Player
+    from library import Library
+    from fake_mpv import FakeMpv
+
+    root = os.path.join(workdir, f"library-{files}")
+    desc = generate_library(root, files)
+    Settings.set('library', 'root_path', root)
+
+    player = Player(ipc_socket=os.path.join(workdir, "mpv-socket"))
+    mpv = FakeMpv(player.ipc_socket)
+    mpv.start()
+    mpv.attach(player)
+    try:
+        lib = Library(player)
+        result = dict(desc)
+
+        result["get_playlists_cold"], _ = timed(lib.get_playlists)
+        result["get_playlists_warm"], _ = timed(lib.get_playlists, repeat)
+
+        playlist = desc["largest_playlist"]
+        result["get_tracks"], tracks = timed(lambda: lib.get_tracks(playlist), repeat)
+        result["tracks_listed"] = len(tracks)
+
+        # fzf stand-in: read every option, select the last one
+        def fake_fzf(options, **kwargs):
+            last = None
+            for last in options:
+                pass
+            return [last] if last is not None else []
+
+        library_mod.fzf_select = fake_fzf
+        result["select_track"], selected = timed(lambda: lib.select_track(playlist), repeat)
+        result["select_track_ok"] = selected == tracks[-1] if tracks else selected is None
+
+        paths = [os.path.abspath(lib.get_track_path(playlist, t)) for t in tracks]
+        result["load_queue"], _ = timed(lambda: lib.queue.load_queue(paths), repeat)
+        result["sync_from_mpv"], _ = timed(lib.queue.sync_from_mpv, repeat)
+        result["queue_ok"] = lib.queue.queue == paths
+
+        lib.watcher.stop()
+        return result
+    finally:
+        player.stop()
+        mpv.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="library sizes in files (default: 1000,10000,100000)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each warm measurement (default: 5)")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="musicli-bench-") as tmp:
+        os.environ.pop("APPDATA", None)
+        os.environ["XDG_CONFIG_HOME"] = os.path.join(tmp, "config")
+        os.environ["HOME"] = tmp
+        sys.path[:0] = [str(SRC), str(BENCH)]
+
+        from settings import Settings
+        Settings.initialize()
+        # measure the rescanning path, not the background watcher
+        Settings.set('library', 'watch', 'False')
+
+        results = [bench_size(n, tmp, args.repeat) for n in sizes]
+
+    print(json.dumps({"benchmark": "library", "repeat": args.repeat, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
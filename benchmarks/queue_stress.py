@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+queue_stress.py
+
+Stress Player and QueueManager against fake_mpv, without mpv or audio.
+
+For each queue size and each mpv behaviour (reply latency, dropped replies),
+this times:
+    - QueueManager.load_queue of the whole queue
+    - random append/move/remove_at operations, then the time until the
+      mirrored queue matches the fake mpv playlist again
+    - simulated ends of tracks, until playlist-pos changes brought the
+      QueueManager's current position up to date
+and checks the queue stays consistent with mpv. Results are printed as JSON.
+
+Usage:
+    python benchmarks/queue_stress.py [--sizes 1000,5000] [--ops 200] [--timeout 1.0]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+SRC = BENCH.parent / "src"
+
+# (name, latency in seconds, drop rate)
+_SCENARIOS = [
+    ("instant", 0.0, 0.0),
+    ("slow", 0.0005, 0.0),
+    ("lossy", 0.0, 0.01),
+]
+
+
+def wait_until(condition, timeout:float) -> float|None:
+    """Return the seconds until condition() held, or None if it did not within timeout."""
+    start = time.perf_counter()
+    while True:
+        if condition():
+            return time.perf_counter() - start
+        if time.perf_counter() - start > timeout:
+            return None
+        time.sleep(0.001)
+
+
+def bench(size:int, latency:float, drop_rate:float, ops:int, timeout:float, workdir:str) -> dict:
+    from player import Player
+    from queue_manager import QueueManager
+    from fake_mpv import FakeMpv
+
+    rng = random.Random(size)
+    paths = [os.path.join(workdir, f"track {i:06d}.flac") for i in range(size)]
+
+    player = Player(ipc_socket=os.path.join(workdir, "mpv-socket"), socket_timeout=timeout)
+    mpv = FakeMpv(player.ipc_socket, latency=latency, drop_rate=drop_rate, seed=size)
+    mpv.start()
+    mpv.attach(player)
+    try:
+        qm = QueueManager(player)
+        result = {"size": size, "latency_s": latency, "drop_rate": drop_rate}
+
+        start = time.perf_counter()
+        qm.load_queue(paths)
+        result["load_queue_s"] = time.perf_counter() - start
+        result["load_queue_ok"] = qm.queue == mpv.playlist == paths
+
+        # random edits through the QueueManager
+        start = time.perf_counter()
+        for i in range(ops):
+            n = len(qm.queue)
+            match rng.choice(("append", "move", "remove")):
+                case "append":
+                    qm.append(os.path.join(workdir, f"extra {i:06d}.flac"))
+                case "move" if n > 1:
+                    qm.move(rng.randrange(n), rng.randrange(n))
+                case "remove" if n > 1:
+                    qm.remove_at(rng.randrange(1, n)) # keep the current track
+        result["ops"] = ops
+        result["ops_s"] = time.perf_counter() - start
+        result["ops_settle_s"] = wait_until(lambda: qm.queue == mpv.playlist, timeout)
+
+        # tracks ending one after the other
+        ends = min(ops, len(mpv.playlist) - 1)
+        start = time.perf_counter()
+        for _ in range(ends):
+            mpv.finish_current()
+        result["track_ends"] = ends
+        result["track_ends_settle_s"] = wait_until(lambda: qm._current_pos == mpv.pos, timeout)
+        result["track_ends_s"] = time.perf_counter() - start
+
+        result["commands"] = mpv.commands
+        result["dropped_replies"] = mpv.dropped_replies
+        result["dropped_events"] = player.dropped_events
+        return result
+    finally:
+        player.stop()
+        mpv.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000", help="queue sizes (default: 1000,5000)")
+    parser.add_argument("--ops", type=int, default=200, help="random queue edits and track ends (default: 200)")
+    parser.add_argument("--timeout", type=float, default=1.0, help="IPC reply timeout in seconds (default: 1.0)")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="musicli-bench-") as tmp:
+        os.environ.pop("APPDATA", None)
+        os.environ["XDG_CONFIG_HOME"] = os.path.join(tmp, "config")
+        os.environ["HOME"] = tmp
+        sys.path[:0] = [str(SRC), str(BENCH)]
+
+        from settings import Settings
+        Settings.initialize()
+
+        results = []
+        for size in sizes:
+            for name, latency, drop_rate in _SCENARIOS:
+                results.append({"scenario": name, **bench(size, latency, drop_rate, args.ops, args.timeout, tmp)})
+
+    print(json.dumps({"benchmark": "queue", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+startup.py
+
+Measure musicli time-to-first-menu.
+
+Each run starts a fresh interpreter on src/main.py with fzf replaced by a
+stand-in that records the time the main menu would be displayed, then quits.
+A throwaway config directory and library are used so the user's settings are
+never touched. Results are printed as JSON.
+
+Usage:
+    python benchmarks/startup.py [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+# executed in the child interpreter
+_CHILD = r"""
+import sys, time, json
+t0 = time.perf_counter()
+sys.path.insert(0, {src!r})
+
+import fzf
+
+def _first_menu(*args, **kwargs):
+    print(json.dumps({{
+        "in_process_s": time.perf_counter() - t0,
+        "yt_dlp_loaded": "yt_dlp" in sys.modules,
+        "mutagen_loaded": "mutagen" in sys.modules,
+    }}), flush=True)
+    raise KeyboardInterrupt
+
+fzf.fzf_select = _first_menu
+
+import main
+main.MusicPlayer().run()
+"""
+
+
+def run_once(env:dict) -> dict:
+    """Start musicli once and return its timings."""
+    code = _CHILD.format(src=str(SRC))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    wall = time.perf_counter() - start
+
+    for line in proc.stdout.splitlines():
+        if line.startswith("{"):
+            result = json.loads(line)
+            result["wall_s"] = wall
+            return result
+    raise RuntimeError(f"musicli did not reach the main menu:\n{proc.stderr}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="number of cold starts (default: 10)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="musicli-bench-") as tmp:
+        env = dict(os.environ)
+        env.pop("APPDATA", None)
+        env["XDG_CONFIG_HOME"] = os.path.join(tmp, "config")
+        env["HOME"] = tmp # default library root: $HOME/Music
+
+        runs = [run_once(env) for _ in range(args.runs)]
+
+    walls = [r["wall_s"] for r in runs]
+    in_process = [r["in_process_s"] for r in runs]
+    print(json.dumps({
+        "benchmark": "time_to_first_menu",
+        "runs": args.runs,
+        "wall_s": {"median": statistics.median(walls), "min": min(walls), "max": max(walls)},
+        "in_process_s": {"median": statistics.median(in_process), "min": min(in_process), "max": max(in_process)},
+        "yt_dlp_loaded": any(r["yt_dlp_loaded"] for r in runs),
+        "mutagen_loaded": any(r["mutagen_loaded"] for r in runs),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
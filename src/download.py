@@ -1,76 +1,82 @@
 """download.py"""
-import yt_dlp
 import os
 import utils
+import hashlib
+import json
 import platform
+import shutil
+import queue
 import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
 from sanitize_filename import sanitize
 
 from settings import Settings
+from origin_index import OriginIndex
+from ydl_pool import pool
+import tracing
 
 class Download:
     """
     Download an audio file.
     """
-    
-    def __init__(self, output_dir:str):
+
+    # renaming checks for collisions, which must not interleave between jobs
+    _rename_lock = threading.Lock()
+
+    def __init__(self, output_dir:str, origins:OriginIndex|None=None):
         """
         output_dir: base directory where downloads will be saved
-        format: audio format to post-process (e.g. 'flac', 'mp3')
+        origins: index of already downloaded source URLs, to skip duplicates in batches
         """
         self.output_dir=output_dir
+        self.origins = origins
         
         utils.ensure_dir(self.output_dir)
 
-    def download_url(self, url:str, subfolder:str, filename:str='') -> str:
+    @staticmethod
+    def _job_key(url:str, subfolder:str) -> str:
+        return hashlib.sha1(f"{subfolder}\0{url}".encode("utf-8")).hexdigest()[:16]
+
+    def _temp_dir(self, url:str, subfolder:str) -> str:
         """
-        Download only audio from a URL into output_dir/subfolder.
-        Returns the full path to the downloaded file.
-        Warning: overwrites file if it already exists.
+        Return the working directory of a download job, unique per (url, subfolder).
+        It is stable across runs, so yt-dlp can resume its .part files.
         """
+        path = os.path.join(Settings.get_config_dir(), 'downloads', self._job_key(url, subfolder))
+        utils.ensure_dir(path)
+        return path
+
+    def _target_dir(self, subfolder:str) -> str:
         if not subfolder:
             raise ValueError("Subfolder must be provided")
 
         # ensure subfolder exists
         target_dir = os.path.join(self.output_dir, subfolder)
         utils.ensure_dir(target_dir)
+        return target_dir
 
-        filename = (filename or '%(title)s') + '.%(ext)s'
-        outtmpl = os.path.join(target_dir, filename)
-
-        preferred_codec = Settings.get('download', 'preferred_codec')
-        preferred_quality = Settings.get('download', 'preferred_quality')
+    def _ydl_opts(self, filename:str, home_dir:str, temp_dir:str, quiet:bool) -> dict:
+        """Options shared by the fetch and process stages."""
         embed_thumbnail = Settings.get_bool('download', 'embed_thumbnail')
 
-        # build options
-        ydl_opts = {
+        return {
             'format': "bestaudio/best", # best as fallback
             'verbose': Settings.get_bool('app', 'debug'),
-            'outtmpl': outtmpl, # output path
+            'quiet': quiet,
+            'noprogress': quiet,
+            'outtmpl': filename, # output file name
+            'paths': {
+                'home': home_dir, # final location
+                'temp': temp_dir, # isolated working files
+            },
 
             'writethumbnail': embed_thumbnail,
             'embedthumbnail': embed_thumbnail,
             'embedmetadata': True,
 
-            # process the final audio file
-            'postprocessors': [
-                # internal metadata (ID3)
-                {
-                    'key': 'FFmpegMetadata',
-                    'add_metadata': True,
-                },
-                # codec & quality
-                {
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': preferred_codec,
-                    'preferredquality' : preferred_quality,
-                },
-                # embed thumbnail
-                {
-                    'key': 'EmbedThumbnail',
-                },
-            ],
-
             'xattrs': True, # internal metadata (e.g. link)
 
             # network settings
@@ -80,37 +86,108 @@ class Download:
             'continuedl': True, # allow resuming partially-downloaded files
         }
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+    def _postprocessors(self) -> list[dict]:
+        """Post-processors applied to the raw audio by the process stage."""
+        return [
+            # internal metadata (ID3)
+            {
+                'key': 'FFmpegMetadata',
+                'add_metadata': True,
+            },
+            # codec & quality
+            {
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': Settings.get('download', 'preferred_codec'),
+                'preferredquality' : Settings.get('download', 'preferred_quality'),
+            },
+            # embed thumbnail
+            {
+                'key': 'EmbedThumbnail',
+            },
+        ]
+
+    @tracing.traced("download.fetch")
+    def fetch(self, url:str, subfolder:str, filename:str='', quiet:bool=False) -> dict:
+        """
+        Network stage: download the raw audio (and thumbnail) into the job directory.
+        Returns the info dict of the downloaded file, to be passed to process().
+        """
+        self._target_dir(subfolder)
+        filename = (filename or '%(title)s') + '.%(ext)s'
+        temp_dir = self._temp_dir(url, subfolder)
+
+        # raw files stay in the job directory until they are processed
+        ydl_opts = self._ydl_opts(filename, home_dir=temp_dir, temp_dir=temp_dir, quiet=quiet)
+
+        with pool.borrow('fetch', ydl_opts) as ydl:
             info = ydl.extract_info(url, download=True)
+            sanitized = ydl.sanitize_info(info)
 
-        # final path
-        final_path = None
         if info.get("requested_downloads"):
-            final_path = info["requested_downloads"][0].get("filepath")
-        elif info.get("_filename"):
-            final_path = info["_filename"]
-        elif info.get("filepath"):
-            final_path = info["filepath"]
-        
+            info = info["requested_downloads"][0]
+            sanitized = sanitized["requested_downloads"][0]
+
+        # keep the info next to the raw file so an interrupted job can be processed later
+        try:
+            with open(os.path.join(temp_dir, 'info.json'), 'w', encoding='utf-8') as f:
+                json.dump(sanitized, f, default=str)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[warn] failed to save download info for {url}: {e}")
+        return info
+
+    def fetched_info(self, url:str, subfolder:str) -> dict|None:
+        """Return the info of a job fetched earlier but never processed, if its raw file is still there."""
+        info_path = os.path.join(Settings.get_config_dir(), 'downloads', self._job_key(url, subfolder), 'info.json')
+        try:
+            with open(info_path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        raw_path = info.get("filepath") or info.get("_filename")
+        return info if raw_path and os.path.isfile(raw_path) else None
+
+    @tracing.traced("download.process")
+    def process(self, url:str, subfolder:str, info:dict, quiet:bool=False) -> str:
+        """
+        CPU stage: tag, transcode and embed the thumbnail of a fetched file,
+        then move it into output_dir/subfolder.
+        Returns the full path to the final file.
+        """
+        target_dir = self._target_dir(subfolder)
+        temp_dir = self._temp_dir(url, subfolder)
+
+        ydl_opts = self._ydl_opts('%(title)s.%(ext)s', home_dir=target_dir, temp_dir=temp_dir, quiet=quiet)
+        ydl_opts['postprocessors'] = self._postprocessors()
+
+        raw_path = info.get("filepath") or info.get("_filename")
+        info['__finaldir'] = target_dir # where the processed file is moved
+
+        with pool.borrow('process', ydl_opts) as ydl:
+            info = ydl.post_process(raw_path, info)
+
+        # final path
+        final_path = info.get("filepath") or info.get("_filename")
+
         if final_path:
             final_path = os.path.abspath(final_path)
 
             # sanitize filename
             try:
-                dirpath, fname = os.path.split(final_path)
-                stem, ext = os.path.splitext(fname)
-                safe_stem = sanitize(stem)
-                if safe_stem != stem:
-                    new_fname = safe_stem + ext
-                    new_path = os.path.join(dirpath, new_fname)
-                    # avoid collision by appending _1, _2...
-                    i = 1
-                    while os.path.exists(new_path):
-                        new_fname = f"{safe_stem}_{i}{ext}"
+                with self._rename_lock:
+                    dirpath, fname = os.path.split(final_path)
+                    stem, ext = os.path.splitext(fname)
+                    safe_stem = sanitize(stem)
+                    if safe_stem != stem:
+                        new_fname = safe_stem + ext
                         new_path = os.path.join(dirpath, new_fname)
-                        i += 1
-                    os.rename(final_path, new_path)
-                    final_path = os.path.abspath(new_path)
+                        # avoid collision by appending _1, _2...
+                        i = 1
+                        while os.path.exists(new_path):
+                            new_fname = f"{safe_stem}_{i}{ext}"
+                            new_path = os.path.join(dirpath, new_fname)
+                            i += 1
+                        os.rename(final_path, new_path)
+                        final_path = os.path.abspath(new_path)
             except Exception as e:
                 # keep original if anything goes wrong
                 print(f"[warn] failed to sanitize/rename {final_path}: {e}")
@@ -132,4 +209,212 @@ class Download:
                 # ignore if setting xattr fails (filesystem or OS may not support it)
                 print(f"[warn] failed to set xattr on {final_path}: {e}")
 
+            if self.origins:
+                self.origins.record(url, final_path)
+
+        # the job is complete: drop its working files
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
         return final_path
+
+    def find_existing(self, url:str, subfolder:str) -> str|None:
+        """
+        Return a library file already downloaded from url for output_dir/subfolder.
+        A copy found in another playlist is hardlinked into subfolder.
+        Returns None if the URL has to be downloaded.
+        """
+        if not self.origins:
+            return None
+        paths = self.origins.lookup(url)
+        if not paths:
+            return None
+
+        target_dir = os.path.abspath(self._target_dir(subfolder))
+        for path in paths:
+            if os.path.dirname(path) == target_dir:
+                return path
+
+        source = paths[0]
+        linked = os.path.join(target_dir, os.path.basename(source))
+        if os.path.exists(linked):
+            # a different file took the name: download it again
+            return linked if os.path.samefile(source, linked) else None
+        try:
+            os.link(source, linked)
+        except OSError:
+            # e.g. playlists on different filesystems
+            return None
+        self.origins.record(url, linked)
+        return linked
+
+    def download_url(self, url:str, subfolder:str, filename:str='', quiet:bool=False) -> str:
+        """
+        Download only audio from a URL into output_dir/subfolder.
+        Intermediate files live in a per-job directory, so jobs can run in parallel.
+        Returns the full path to the downloaded file.
+        Warning: overwrites file if it already exists.
+        """
+        info = self.fetch(url, subfolder, filename=filename, quiet=quiet)
+        return self.process(url, subfolder, info, quiet=quiet)
+
+    def download_batch(self, jobs:list[tuple[str, str, str]]) -> list[str|None]:
+        """
+        Download (url, subfolder, filename) jobs through a DownloadPipeline.
+        Returns the saved paths in the order of jobs (None for failed jobs).
+        """
+        with DownloadPipeline(self) as pipeline:
+            futures = [pipeline.submit(*job) for job in jobs]
+        return [f.result() for f in futures]
+
+
+class DownloadPipeline:
+    """
+    Two-stage download pipeline.
+
+    Network workers ([download] concurrency) fetch raw audio, CPU workers
+    (one per core) transcode and tag it. Both stages are connected by a
+    bounded queue, so fetching runs ahead of transcoding without piling up
+    raw files.
+    """
+
+    # seconds fetch workers wait for the origin index before looking for
+    # duplicates in whatever part of the library it covers already
+    _SEED_WAIT = 10.0
+
+    def __init__(self, downloader:Download, fetch_workers:int|None=None, process_workers:int|None=None, quiet:bool|None=None):
+        """
+        downloader: Download instance running each stage
+        fetch_workers: parallel fetches (default: [download] concurrency)
+        process_workers: parallel post-processing jobs (default: CPU count)
+        quiet: silence yt-dlp output (default: when several jobs may run at once)
+        """
+        if fetch_workers is None:
+            try:
+                fetch_workers = int(Settings.get('download', 'concurrency'))
+            except ValueError:
+                fetch_workers = 1
+        self.fetch_workers = max(1, fetch_workers)
+        self.process_workers = max(1, process_workers or os.cpu_count() or 1)
+        self.downloader = downloader
+
+        # pick up files added since the last batch; fetch workers wait for it
+        # (at most _SEED_WAIT) before looking for duplicates, submit() never does
+        if downloader.origins:
+            downloader.origins.seed_async()
+        self._seed_deadline = time.monotonic() + self._SEED_WAIT
+
+        # interleaved progress bars are unreadable: keep parallel jobs quiet
+        if quiet is None:
+            quiet = self.fetch_workers + self.process_workers > 2
+        self.quiet = quiet and not Settings.get_bool('app', 'debug')
+
+        self._tasks: list[tuple[Future, Future]] = [] # (fetch task, job future)
+        self._closed = False
+        self._fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_workers)
+        self._fetched: queue.Queue = queue.Queue(maxsize=self.process_workers * 2)
+        self._processors = [
+            threading.Thread(target=self._process_loop, daemon=True)
+            for _ in range(self.process_workers)
+        ]
+        for t in self._processors:
+            t.start()
+
+    def submit(self, url:str, subfolder:str, filename:str='', on_stage:Callable[[str, str|None], None]|None=None) -> Future:
+        """
+        Queue a download; the future resolves to the saved path (None on failure).
+        Tracks already in the library are not fetched again, and jobs fetched by
+        an interrupted run go straight to post-processing.
+
+        on_stage(stage, detail) is called from the workers when the job is
+        'downloaded', 'processed' (detail: path) or 'failed' (detail: error).
+        """
+        future = Future()
+        task = self._fetch_pool.submit(self._fetch, future, url, subfolder, filename, on_stage)
+        self._tasks.append((task, future))
+        return future
+
+    @staticmethod
+    def _notify(on_stage, stage:str, detail:str|None=None) -> None:
+        if on_stage:
+            try:
+                on_stage(stage, detail)
+            except Exception as e:
+                print(f"[warn] download stage callback failed: {e}")
+
+    def _existing(self, url:str, subfolder:str) -> str|None:
+        if self.downloader.origins:
+            self.downloader.origins.wait_seeded(max(0.0, self._seed_deadline - time.monotonic()))
+        try:
+            return self.downloader.find_existing(url, subfolder)
+        except OSError:
+            return None
+
+    def _fetch(self, future:Future, url:str, subfolder:str, filename:str, on_stage) -> None:
+        existing = self._existing(url, subfolder)
+        if existing:
+            self._notify(on_stage, 'processed', existing)
+            future.set_result(existing)
+            return
+        try:
+            info = self.downloader.fetched_info(url, subfolder) \
+                or self.downloader.fetch(url, subfolder, filename=filename, quiet=self.quiet)
+        except Exception as e:
+            print(f"[warn] failed to download {url}: {e}")
+            self._notify(on_stage, 'failed', str(e))
+            future.set_result(None)
+            return
+        self._notify(on_stage, 'downloaded')
+        # blocks while the CPU stage is saturated
+        self._fetched.put((future, url, subfolder, info, on_stage))
+
+    def _process_loop(self) -> None:
+        while True:
+            item = self._fetched.get()
+            if item is None:
+                return
+            future, url, subfolder, info, on_stage = item
+            try:
+                path = self.downloader.process(url, subfolder, info, quiet=self.quiet)
+            except Exception as e:
+                print(f"[warn] failed to process {url}: {e}")
+                self._notify(on_stage, 'failed', str(e))
+                future.set_result(None)
+                continue
+            self._notify(on_stage, 'processed', path)
+            future.set_result(path)
+
+    def close(self, cancel:bool=False) -> None:
+        """
+        Wait for every submitted job to finish and stop the workers.
+        With cancel, jobs not fetching yet are dropped (their futures resolve to None).
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            self._fetch_pool.shutdown(wait=True, cancel_futures=cancel)
+        except KeyboardInterrupt:
+            # stop waiting: drop the jobs not fetching yet, the running ones
+            # finish in the background
+            self._fetch_pool.shutdown(wait=False, cancel_futures=True)
+            self._resolve_cancelled()
+            raise
+        self._resolve_cancelled()
+        for _ in self._processors:
+            self._fetched.put(None)
+        for t in self._processors:
+            t.join()
+
+    def _resolve_cancelled(self) -> None:
+        for task, future in self._tasks:
+            if task.cancelled() and not future.done():
+                # never reached the fetch stage, so nothing else will resolve it
+                future.set_result(None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        # interrupted (e.g. Ctrl-C): drop the jobs not fetching yet
+        self.close(cancel=exc_type is not None)
@@ -1,20 +1,102 @@
 """fzf.py"""
+import functools
 import subprocess
 import os
+import shlex
+import tempfile
+import threading
+from collections import deque
+from typing import Iterable, Iterator
 
 from settings import Settings
+import tracing
 
-def fzf_select(options:list[str], multi:bool=False, prompt:str="", start_option:str|int=None, raise_except:bool=False) -> list[str]:
+def _feed(options:Iterable[str], stdin, stop:threading.Event) -> None:
+    """
+    Write options into fzf's stdin as they are produced.
+
+    A reader thread pulls from options while this thread writes whatever is
+    available in one go: fast sources are written in large chunks, and slow
+    ones (e.g. network results) show up in fzf as soon as they arrive.
+    """
+    pending = deque()
+    available = threading.Event()
+    exhausted = threading.Event()
+
+    def pull():
+        try:
+            for option in options:
+                if stop.is_set():
+                    break
+                pending.append(option)
+                if not available.is_set():
+                    available.set()
+        finally:
+            exhausted.set()
+            available.set()
+
+    # never joined: it may be blocked in a slow source (e.g. the next page of
+    # results) long after fzf exited, and stops at its next option
+    reader = threading.Thread(target=pull, daemon=True)
+    reader.start()
+    try:
+        while not stop.is_set():
+            # wake up now and then to notice that fzf exited
+            if not available.wait(0.1):
+                continue
+            available.clear()
+            chunk = []
+            while pending:
+                chunk.append(pending.popleft())
+            if chunk:
+                stdin.write("\n".join(chunk) + "\n")
+                stdin.flush()
+            if exhausted.is_set() and not pending:
+                break
+    except (BrokenPipeError, OSError, ValueError):
+        # fzf exited before reading everything
+        stop.set()
+    finally:
+        try:
+            stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+@functools.lru_cache(maxsize=1)
+def _fzf_version() -> tuple[int, ...]:
+    """Return fzf's version (e.g. (0, 44, 1)), or () if it cannot be read."""
+    try:
+        out = subprocess.run(["fzf", "--version"], capture_output=True, text=True, check=False).stdout
+        return tuple(int(n) for n in out.split()[0].split("."))
+    except (OSError, IndexError, ValueError):
+        return ()
+
+def _locate(options:Iterable[str], start_option:str, pos_path:str) -> Iterator[str]:
+    """Pass options through, writing the fzf action moving to start_option once it is seen."""
+    for i, option in enumerate(options):
+        if option == start_option:
+            with open(pos_path, 'w', encoding='utf-8') as f:
+                f.write(f"pos({i + 1})") # fzf is 1-based
+            yield option
+            yield from options
+            return
+        yield option
+
+@tracing.traced("fzf_select")
+def fzf_select(options:Iterable[str], multi:bool=False, prompt:str="", start_option:str|int=None, raise_except:bool=False) -> list[str]:
     """
     Display options in fzf and return selected option(s).
 
     Args:
-        options: List of strings to show in fzf.
+        options: Strings to show in fzf; any iterable (e.g. a generator) is
+            streamed into fzf while it is being read.
         multi: If True, allow multi-selection.
         prompt: Prompt text to display.
-        start_option: If provided, initial highlighted option.
+        start_option: If provided, initial highlighted option (an option
+            looked up while streaming needs fzf >= 0.45; with older versions
+            the options are read first).
     """
-    
+
     fzf_cmd = [
         "fzf",
         "--prompt", prompt,
@@ -26,7 +108,19 @@ def fzf_select(options:list[str], multi:bool=False, prompt:str="", start_option:
     ]
     if multi:
         fzf_cmd.append("--multi")
-    if start_option:
+    pos_path = None
+    if start_option and isinstance(start_option, str) and not isinstance(options, list) \
+            and _fzf_version() < (0, 45):
+        # no load:transform: look the option up in the whole list
+        options = list(options)
+    if start_option and isinstance(start_option, str) and not isinstance(options, list):
+        # the position is only known once the option is streamed: fzf reads
+        # it back when loading ends (the file is written before stdin closes)
+        fd, pos_path = tempfile.mkstemp(prefix='fzf-pos-')
+        os.close(fd)
+        options = _locate(iter(options), start_option, pos_path)
+        fzf_cmd += ["--bind", f"load:transform:cat {shlex.quote(pos_path)}"]
+    elif start_option:
         try:
             if isinstance(start_option, str):
                 idx = options.index(start_option)
@@ -39,17 +133,30 @@ def fzf_select(options:list[str], multi:bool=False, prompt:str="", start_option:
             cursor_pos = 1
         fzf_cmd += ["--bind", f"load:pos({cursor_pos})"]
 
-    fzf = subprocess.run(
+    fzf = subprocess.Popen(
         fzf_cmd,
-        input="\n".join(options),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
         text=True,
-        capture_output=True,
     )
 
-    if raise_except and fzf.returncode != 0:
+    stop = threading.Event()
+    writer = threading.Thread(target=_feed, args=(options, fzf.stdin, stop), daemon=True)
+    writer.start()
+
+    stdout = fzf.stdout.read()
+    returncode = fzf.wait()
+    # the selection is made: stop producing options
+    stop.set()
+    writer.join()
+    if pos_path:
+        os.unlink(pos_path)
+
+    if raise_except and returncode != 0:
         raise KeyboardInterrupt
-    
-    if not fzf.stdout:
+
+    if not stdout:
         return []
-    
-    return fzf.stdout.strip().split("\n")
+
+    return stdout.strip().split("\n")
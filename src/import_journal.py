@@ -0,0 +1,94 @@
+"""import_journal.py"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from settings import Settings
+
+
+class ImportJournal:
+    """
+    Persistent record of a SearchFile import (one entry per query line).
+
+    Each entry keeps its state and what is known so far (resolved URL, output
+    filename, final path, error), so an interrupted import resumes where it
+    stopped instead of re-resolving and re-downloading from the first line.
+    """
+
+    PENDING = "pending"
+    RESOLVED = "resolved" # URL known and confirmed
+    SKIPPED = "skipped" # declined by the user or no result
+    DOWNLOADED = "downloaded" # raw audio fetched, not post-processed yet
+    PROCESSED = "processed" # final file in the library
+    FAILED = "failed"
+
+    # states that need no more work on resume
+    DONE = (SKIPPED, PROCESSED)
+
+    def __init__(self, source:str, playlist:str):
+        """
+        source: path of the query file being imported
+        playlist: playlist the import downloads into
+        """
+        self.source = os.path.abspath(source)
+        self.playlist = playlist
+
+        key = hashlib.sha1(f"{self.source}\0{playlist}".encode("utf-8")).hexdigest()[:16]
+        self.path: Path = Settings.get_config_dir() / 'imports' / f"{key}.json"
+
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        try:
+            with self.path.open('r', encoding='utf-8') as f:
+                self._entries = json.load(f).get('entries', {})
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self) -> None:
+        """Write the journal atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump({'source': self.source, 'playlist': self.playlist, 'entries': self._entries}, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def entry(self, line:int, query:str) -> dict:
+        """Return the recorded entry of a line, or {} if unknown or the line changed."""
+        with self._lock:
+            entry = self._entries.get(str(line))
+            if not entry or entry.get('query') != query:
+                return {}
+            return dict(entry)
+
+    def state(self, line:int, query:str) -> str:
+        return self.entry(line, query).get('state', self.PENDING)
+
+    def update(self, line:int, query:str, state:str, **fields) -> None:
+        """Record the new state of a line (and any known fields) on disk."""
+        with self._lock:
+            entry = self._entries.get(str(line))
+            if not entry or entry.get('query') != query:
+                entry = {'query': query}
+            entry.update(fields, state=state)
+            self._entries[str(line)] = entry
+            self._save()
+
+    def is_complete(self, lines:int) -> bool:
+        """Return True if every one of the lines needs no more work."""
+        with self._lock:
+            return all(self._entries.get(str(i), {}).get('state') in self.DONE for i in range(1, lines + 1))
+
+    def has_progress(self) -> bool:
+        with self._lock:
+            return bool(self._entries)
+
+    def remove(self) -> None:
+        """Forget the journal once the import is complete."""
+        with self._lock:
+            self._entries = {}
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
@@ -5,9 +5,17 @@ from fzf import fzf_select
 from search import Search
 from player import Player
 from queue_manager import QueueManager
+from library_index import LibraryIndex, IndexedTrack
+from metadata import MetadataCache, TrackMetadata
+from watcher import LibraryWatcher
+from origin_index import OriginIndex
+from track_search import TrackSearch
 
 import utils
+import threading
 from collections import Counter
+from itertools import chain
+from typing import Iterator
 
 class Library:
     def __init__(self, player:Player):
@@ -17,14 +25,36 @@ class Library:
 
         self.queue = QueueManager(self.player)
 
-        self.music_formats = Settings.get('library', 'music_formats').split(',')
+        self.music_formats = list(Settings.get_list('library', 'music_formats'))
+
+        self.index = LibraryIndex(
+            Settings.get('library', 'root_path'),
+            Settings.get_config_dir() / 'library.db'
+        )
+        self.metadata = MetadataCache(Settings.get_config_dir() / 'library.db')
+        self.origins = OriginIndex(Settings.get_config_dir() / 'library.db', self.index)
+
+        # cross-playlist full-text search (needs sqlite with FTS5)
+        self.track_search = None
+        if TrackSearch.available():
+            self.track_search = TrackSearch(Settings.get_config_dir() / 'library.db', self.index, self.metadata)
+        self._tagging_thread: threading.Thread|None = None
+
+        # keep the index up to date in the background so menus never rescan
+        self.watcher = LibraryWatcher(self.index)
+        if Settings.get_bool('library', 'watch'):
+            self.watcher.start()
 
         self.current_playlist : str = None
         self.current_track : str = None
+        self.current_track_file : str = None # filename of current_track, when it is a track
+        self.current_tracks : list[str] = [] # tracks listed by the last select_track
         
         self.current_option : str = None
+        self.last_find : str = ''
 
         self._back_text = "[ Back ]"
+        self._find_text = "[ Find Anywhere ]"
         self._playlist_add_text = "[ New Playlist ]"
         self._playlist_remove_text = "[ Remove Playlist ]"
         self._track_add_text = "[ Add Track ]"
@@ -32,17 +62,16 @@ class Library:
 
         self.actions = [self._back_text]
         self.playlist_actions = [self._playlist_add_text, self._playlist_remove_text]
+        if self.track_search:
+            self.playlist_actions.insert(0, self._find_text)
         self.track_actions = [self._track_add_text, self._track_delete_text]
 
     def get_playlists(self) -> list[str]:
         """Return list of subdirectories in root_path, excluding hidden"""
-        playlists = []
-        try:
-            playlists = [d for d in os.listdir(Settings.get('library', 'root_path')) \
-                if os.path.isdir(os.path.join(Settings.get('library', 'root_path'), d)) and (not d.startswith('.') if Settings.get('library', 'hidden_files') == 'False' else True)]
-        except FileNotFoundError:
-            return playlists
-        
+        if not self.watcher.is_live():
+            self.index.refresh()
+        playlists = self.index.get_playlists(hidden=Settings.get_bool('library', 'hidden_files'))
+
         match Settings.get('library', 'sort_playlists_by'):
             case 'name':
                 return sorted(playlists)
@@ -59,11 +88,9 @@ class Library:
 
     def get_files(self, playlist:str) -> list[str]:
         """Return all file names in a playlist directory"""
-        p = self.get_playlist_path(playlist)
-        try:
-            return os.listdir(p)
-        except FileNotFoundError:
-            return []
+        if not self.watcher.is_live():
+            self.index.refresh_playlist(playlist)
+        return [t.name for t in self.index.get_tracks(playlist)]
 
     def is_track(self, name: str) -> bool:
         """Return True if file is audio track based on extension"""
@@ -71,13 +98,38 @@ class Library:
 
     def get_tracks(self, playlist: str) -> list[str]:
         """Return sorted list of tracks in playlist"""
-        tracks = [f for f in self.get_files(playlist) if self.is_track(f)]
-        
+        if not self.watcher.is_live():
+            self.index.refresh_playlist(playlist)
+        rows = self.index.get_tracks(playlist, self.music_formats)
+
         match Settings.get('library', 'sort_tracks_by'):
             case 'name':
-                return sorted(tracks)
+                return sorted(t.name for t in rows)
+            case 'added':
+                # most recently added first
+                return [t.name for t in sorted(rows, key=lambda t: (-t.mtime, t.name))]
+            case 'artist' | 'album' | 'duration' as key:
+                return self._sort_by_metadata(playlist, rows, key)
             case _:
-                return tracks
+                return [t.name for t in rows]
+
+    def _sort_by_metadata(self, playlist:str, rows:list[IndexedTrack], key:str) -> list[str]:
+        """Sort indexed tracks by a cached tag; tracks missing the tag come last."""
+        paths = {t.name: self.get_track_path(playlist, t.name) for t in rows}
+        meta = self.metadata.get_many([(paths[t.name], t.mtime, t.size) for t in rows])
+
+        def sort_key(t:IndexedTrack):
+            md = meta.get(paths[t.name]) or TrackMetadata()
+            number = md.tracknumber if md.tracknumber is not None else float('inf')
+            match key:
+                case 'artist':
+                    return (not md.artist, md.artist.lower(), md.album.lower(), number, t.name)
+                case 'album':
+                    return (not md.album, md.album.lower(), number, t.name)
+                case _:
+                    return (md.duration is None, md.duration or 0, t.name)
+
+        return [t.name for t in sorted(rows, key=sort_key)]
 
     def select_playlist(self, prompt:str="Select a playlist: ", custom_actions:bool=True, start_at_first_element:bool=True) -> str|None:
         """
@@ -109,6 +161,11 @@ class Library:
         if not choice or choice == self._back_text:
             self.current_option = choice
             return None
+        # search every playlist
+        elif choice == self._find_text:
+            self.current_option = choice
+            self.find_anywhere()
+            return ''
         # add playlist option
         elif choice == self._playlist_add_text:
             self.current_option = choice
@@ -136,6 +193,64 @@ class Library:
 
         return choice
 
+    def _start_tagging(self) -> None:
+        """Read missing tags into the search index in the background (once per session)."""
+        if self._tagging_thread and self._tagging_thread.is_alive():
+            return
+        def run():
+            try:
+                self.track_search.tag_missing()
+            except Exception as e:
+                print(f"[warn] failed to index tags: {e}")
+        self._tagging_thread = threading.Thread(target=run, daemon=True)
+        self._tagging_thread.start()
+
+    def find_anywhere(self) -> None:
+        """
+        Find tracks across every playlist by filename or tags and queue the
+        selected ones (playback starts with them if nothing is queued).
+        """
+        if not self.watcher.is_live():
+            self.index.refresh()
+        self.track_search.sync()
+        self._start_tagging()
+
+        while True:
+            try:
+                query = utils.input_with_placeholder("Find a track: ", self.last_find)
+            except (EOFError, KeyboardInterrupt):
+                return
+            if not query:
+                return
+            self.last_find = query
+
+            hits = self.track_search.search(
+                query, self.music_formats, hidden=Settings.get_bool('library', 'hidden_files')
+            )
+            if not hits:
+                print("No tracks found.")
+                continue
+
+            # playlist names never contain '/', so lines map back to their track
+            sel = fzf_select(
+                (f"{hit.playlist}/{hit.name}" for hit in hits),
+                multi=True,
+                prompt="Select tracks to queue (TAB select): "
+            ) or []
+            paths = [
+                os.path.abspath(self.get_track_path(*line.split('/', 1)))
+                for line in sel if '/' in line
+            ]
+            if not paths:
+                continue
+
+            if self.player.is_playing() and self.queue.queue:
+                for path in paths:
+                    self.queue.append(path)
+                print(f"Queued {len(paths)} track(s).")
+            else:
+                self.queue.load_queue(paths)
+
     def create_playlist(self) -> None:
         """Create a new playlist folder"""
         try:
@@ -143,6 +258,7 @@ class Library:
             if name:
                 path = self.get_playlist_path(name)
                 utils.ensure_dir(path)
+                self.index.add_playlist(name)
                 return name
         except KeyboardInterrupt:
             pass
@@ -159,46 +275,61 @@ class Library:
             path = self.get_playlist_path(playlist)
             try:
                 os.rmdir(path)
+                self.index.remove_playlist(playlist)
                 return playlist
             except OSError as e:
                 return self.remove_playlist(str(e))
         return ''
 
-    def _display_name(self, filename:str) -> str:
+    def _display_name(self, filename:str, show_extensions:bool|None=None) -> str:
         """Return the name shown to the user (optionally without extension)."""
-        if Settings.get_bool("library", "show_extensions"):
+        if show_extensions is None:
+            show_extensions = Settings.get_bool("library", "show_extensions")
+        if show_extensions:
             return filename
         return os.path.splitext(filename)[0]
 
+    def _track_names(self, filenames:list[str], show_extensions:bool) -> Iterator[str]:
+        """Yield the display name of each track, in order."""
+        if show_extensions:
+            yield from filenames
+            return
+
+        # disambiguate duplicate display names by appending extension in parentheses
+        stems = Counter(os.path.splitext(f)[0] for f in filenames)
+        for f in filenames:
+            name, ext = os.path.splitext(f)
+            if stems[name] > 1:
+                yield f"{name} ({ext[1:] if ext else ''})"
+            else:
+                yield name
+
     def select_track(self, playlist:str, prompt:str="Select a track: ", custom_actions:bool=True, start_at_first_element:bool=True) -> str|None:
         """
         Let user select a track in a playlist, or go back.
         Returns track filename or None if back.
         """
         raw_options = self.get_tracks(playlist)
-        display_names = [self._display_name(f) for f in raw_options]
+        self.current_tracks = raw_options
+        show_extensions = Settings.get_bool("library", "show_extensions")
 
-        # disambiguate duplicate display names by appending extension in parentheses
-        dup_counts = Counter(display_names)
-        for i, name in enumerate(display_names):
-            if dup_counts[name] > 1:
-                ext = os.path.splitext(raw_options[i])[1]
-                display_names[i] = f"{name} ({ext[1:] if ext else ''})"
+        actions = self.actions + (self.track_actions if custom_actions else [])
 
-        fzf_options = list(display_names)
-        if custom_actions:
-            fzf_options = self.track_actions + fzf_options
-        fzf_options = self.actions + fzf_options
-
-        if self.current_track:
+        if self.current_track in actions:
+            start_option = actions.index(self.current_track)
+        elif self.current_track and self.current_track_file in raw_options:
+            # located by filename, so display names need not be built twice
+            start_option = len(actions) + raw_options.index(self.current_track_file)
+        elif self.current_track:
             start_option = self.current_track
         elif start_at_first_element:
-            start_option = len(self.actions) + (len(self.track_actions) if custom_actions else 0)
+            start_option = len(actions)
         else:
             start_option = 0
-        
+
+        # display names are generated while fzf reads them
         sel = fzf_select(
-            fzf_options,
+            chain(actions, self._track_names(raw_options, show_extensions)),
             multi=False,
             prompt=f"{playlist} - {prompt}",
             start_option=start_option
@@ -207,6 +338,7 @@ class Library:
 
         if choice:
             self.current_track = choice
+            self.current_track_file = None
 
         # add track
         if choice == self._track_add_text:
@@ -219,10 +351,11 @@ class Library:
             self.current_track = None
             return None
 
-        try:
-            return raw_options[display_names.index(choice)]
-        except:
-            return None
+        for filename, name in zip(raw_options, self._track_names(raw_options, show_extensions)):
+            if name == choice:
+                self.current_track_file = filename
+                return filename
+        return None
 
     def add_track(self) -> None:
         Search(library=self, player=self.player, playlist=self.current_playlist).run()
@@ -234,6 +367,7 @@ class Library:
             path = self.get_track_path(self.current_playlist, track)
             try:
                 os.remove(path)
+                self.index.remove_track(self.current_playlist, track)
             except OSError as e:
                 return self.delete_track(str(e))
         return ''
@@ -270,18 +404,24 @@ class Library:
                 if not track:
                     break
 
-                path = self.get_track_path(playlist, track)
-
-                # manage queue
-                tracks = self.get_tracks(playlist)
+                # manage queue (reuse the listing fzf was fed with)
+                tracks = self.current_tracks
                 try:
                     idx = tracks.index(track)
                 except ValueError:
                     print("Selected track not in playlist anymore.")
                     continue
 
-                ordered = tracks[idx:] + tracks[:idx]
-                paths = [os.path.abspath(self.get_track_path(playlist, t)) for t in ordered]
-
                 # load the queue into mpv
-                self.queue.load_queue(paths)
+                window = self.queue.window_size()
+                if window > 0:
+                    # only the next tracks are loaded, paths are built as they are reached
+                    self.queue.load_window(
+                        tracks, idx,
+                        path_of=lambda t, playlist=playlist: os.path.abspath(self.get_track_path(playlist, t)),
+                        size=window
+                    )
+                else:
+                    ordered = tracks[idx:] + tracks[:idx]
+                    paths = [os.path.abspath(self.get_track_path(playlist, t)) for t in ordered]
+                    self.queue.load_queue(paths)
@@ -0,0 +1,253 @@
+"""library_index.py"""
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import tracing
+
+
+class IndexedTrack(NamedTuple):
+    """A track row of the library index."""
+    name: str
+    size: int
+    mtime: int # nanoseconds
+    ext: str # lowercase, without dot
+
+
+class LibraryIndex:
+    """
+    Persistent on-disk index of the library (playlists and their tracks).
+
+    Directories are only rescanned when their mtime differs from the one
+    recorded at the previous scan, so listing a playlist does not touch
+    the files it contains.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS playlists (
+            name TEXT PRIMARY KEY,
+            mtime INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS tracks (
+            playlist TEXT NOT NULL,
+            name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            ext TEXT NOT NULL,
+            PRIMARY KEY (playlist, name)
+        );
+    """
+
+    def __init__(self, root_path:str, db_path:Path):
+        """
+        root_path: library root directory (one subdirectory per playlist)
+        db_path: sqlite database file holding the index
+        """
+        self.root_path = root_path
+        self.db_path = db_path
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._db.executescript(self._SCHEMA)
+
+        # the index belongs to a single root: start over if it moved
+        if self._get_meta('root_path') != os.path.abspath(root_path):
+            self._clear()
+            self._set_meta('root_path', os.path.abspath(root_path))
+            self._db.commit()
+
+    # -------------------------
+    # helpers
+    # -------------------------
+    @staticmethod
+    def _mtime(path:str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def _ext(name:str) -> str:
+        return os.path.splitext(name)[1][1:].lower()
+
+    def _get_meta(self, key:str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key:str, value:str) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _clear(self) -> None:
+        self._db.execute("DELETE FROM tracks")
+        self._db.execute("DELETE FROM playlists")
+        self._db.execute("DELETE FROM meta WHERE key = 'root_mtime'")
+
+    def _playlist_path(self, playlist:str) -> str:
+        return os.path.join(self.root_path, playlist)
+
+    def _scan_playlist(self, playlist:str, mtime:int) -> None:
+        """Replace the indexed tracks of a playlist with the directory content."""
+        rows = []
+        try:
+            with os.scandir(self._playlist_path(playlist)) as it:
+                for entry in it:
+                    try:
+                        if not entry.is_file():
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    rows.append((playlist, entry.name, st.st_size, st.st_mtime_ns, self._ext(entry.name)))
+        except OSError:
+            self._drop_playlist(playlist)
+            return
+
+        self._db.execute("DELETE FROM tracks WHERE playlist = ?", (playlist,))
+        self._db.executemany(
+            "INSERT INTO tracks (playlist, name, size, mtime, ext) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        self._db.execute("INSERT OR REPLACE INTO playlists (name, mtime) VALUES (?, ?)", (playlist, mtime))
+
+    def _drop_playlist(self, playlist:str) -> None:
+        self._db.execute("DELETE FROM tracks WHERE playlist = ?", (playlist,))
+        self._db.execute("DELETE FROM playlists WHERE name = ?", (playlist,))
+
+    # -------------------------
+    # scanning
+    # -------------------------
+    @tracing.traced("index.refresh")
+    def refresh(self, force:bool=False) -> None:
+        """
+        Bring the index up to date, rescanning only directories whose mtime changed.
+        force: rescan every playlist (e.g. after changes to files were missed)
+        """
+        with self._lock:
+            root_mtime = self._mtime(self.root_path)
+            if root_mtime is None:
+                self._clear()
+                self._db.commit()
+                return
+
+            known = dict(self._db.execute("SELECT name, mtime FROM playlists"))
+
+            # root changed: playlists may have been added or removed
+            if str(root_mtime) != self._get_meta('root_mtime'):
+                current = set()
+                try:
+                    with os.scandir(self.root_path) as it:
+                        for entry in it:
+                            try:
+                                if entry.is_dir():
+                                    current.add(entry.name)
+                            except OSError:
+                                continue
+                except OSError:
+                    pass
+
+                for name in known.keys() - current:
+                    self._drop_playlist(name)
+                    del known[name]
+                for name in current - known.keys():
+                    known[name] = None # never scanned
+                self._set_meta('root_mtime', str(root_mtime))
+
+            for name, mtime in known.items():
+                current_mtime = self._mtime(self._playlist_path(name))
+                if current_mtime is None:
+                    self._drop_playlist(name)
+                elif force or current_mtime != mtime:
+                    self._scan_playlist(name, current_mtime)
+
+            self._db.commit()
+
+    @tracing.traced("index.refresh_playlist")
+    def refresh_playlist(self, playlist:str) -> None:
+        """Rescan a single playlist if its mtime changed."""
+        with self._lock:
+            row = self._db.execute("SELECT mtime FROM playlists WHERE name = ?", (playlist,)).fetchone()
+            current_mtime = self._mtime(self._playlist_path(playlist))
+            if current_mtime is None:
+                self._drop_playlist(playlist)
+            elif not row or row[0] != current_mtime:
+                self._scan_playlist(playlist, current_mtime)
+            else:
+                return
+            self._db.commit()
+
+    # -------------------------
+    # direct updates
+    # -------------------------
+    def add_playlist(self, playlist:str) -> None:
+        """Record (and scan) a newly created playlist directory."""
+        with self._lock:
+            mtime = self._mtime(self._playlist_path(playlist))
+            if mtime is not None:
+                self._scan_playlist(playlist, mtime)
+                self._db.commit()
+
+    def remove_playlist(self, playlist:str) -> None:
+        """Forget a removed playlist directory."""
+        with self._lock:
+            self._drop_playlist(playlist)
+            self._db.commit()
+
+    def add_track(self, playlist:str, name:str) -> None:
+        """Record (or update) a single file of a playlist."""
+        try:
+            st = os.stat(os.path.join(self._playlist_path(playlist), name))
+        except OSError:
+            self.remove_track(playlist, name)
+            return
+        with self._lock:
+            if not self._db.execute("SELECT 1 FROM playlists WHERE name = ?", (playlist,)).fetchone():
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO tracks (playlist, name, size, mtime, ext) VALUES (?, ?, ?, ?, ?)",
+                (playlist, name, st.st_size, st.st_mtime_ns, self._ext(name))
+            )
+            self._db.commit()
+
+    def remove_track(self, playlist:str, name:str) -> None:
+        """Forget a removed track."""
+        with self._lock:
+            self._db.execute("DELETE FROM tracks WHERE playlist = ? AND name = ?", (playlist, name))
+            self._db.commit()
+
+    # -------------------------
+    # queries
+    # -------------------------
+    def get_playlists(self, hidden:bool=False) -> list[str]:
+        """Return indexed playlist names, optionally including hidden ones."""
+        with self._lock:
+            names = [r[0] for r in self._db.execute("SELECT name FROM playlists")]
+        if hidden:
+            return names
+        return [n for n in names if not n.startswith('.')]
+
+    def get_tracks(self, playlist:str, formats:list[str]|None=None) -> list[IndexedTrack]:
+        """Return indexed files of a playlist, optionally restricted to extensions."""
+        query = "SELECT name, size, mtime, ext FROM tracks WHERE playlist = ?"
+        args = [playlist]
+        if formats is not None:
+            formats = [f.strip().lower() for f in formats]
+            query += f" AND ext IN ({','.join('?' * len(formats))})"
+            args += formats
+        with self._lock:
+            return [IndexedTrack(*r) for r in self._db.execute(query, args)]
+
+    def iter_tracks(self) -> list[tuple[str, IndexedTrack]]:
+        """Return (playlist, track) pairs for every indexed file."""
+        with self._lock:
+            rows = self._db.execute("SELECT playlist, name, size, mtime, ext FROM tracks").fetchall()
+        return [(r[0], IndexedTrack(*r[1:])) for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
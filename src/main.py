@@ -8,6 +8,8 @@ from search import Search
 from search_file import SearchFile
 from settings import Settings
 from fzf import fzf_select
+from ydl_pool import pool
+import tracing
 
 class MusicPlayer:
     """
@@ -19,6 +21,10 @@ class MusicPlayer:
         """
         Settings.initialize()
 
+        # spans of the hot paths, written on exit
+        if Settings.get_bool('app', 'trace') or Settings.get_bool('app', 'debug'):
+            tracing.enable()
+
         self.actions = ["Library", "Search", "Download", "Settings", "Quit"]
         self.current_action = None
 
@@ -27,6 +33,10 @@ class MusicPlayer:
         self.search = Search(self.library, self.player)
         self.search_file = SearchFile(self.library, self.player)
 
+        # spawn an idle mpv while the main menu is displayed
+        if Settings.get_bool('player', 'prewarm'):
+            self.player.prewarm()
+
     def enter_library(self) -> None:
         """Enter library menu."""
         self.library.run()
@@ -76,7 +86,17 @@ class MusicPlayer:
         finally:
             # stop the active media player
             self.player.stop()
+            yt_dlp_stats = pool.stats()
+            pool.close()
             utils.clear_screen()
 
+            if Settings.get_bool('app', 'debug'):
+                print(f"[debug] yt-dlp instances: {yt_dlp_stats}")
+
+            tracer = tracing.disable()
+            if tracer:
+                trace_path, histogram_path = tracer.write(Settings.get_config_dir() / 'traces')
+                print(f"[debug] trace written to {trace_path} (latency histogram: {histogram_path})")
+
 if __name__ == "__main__":
     MusicPlayer().run()
@@ -0,0 +1,142 @@
+"""metadata.py"""
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+
+class TrackMetadata(NamedTuple):
+    """Tags and stream information of an audio file."""
+    artist: str = ''
+    album: str = ''
+    title: str = ''
+    tracknumber: Optional[int] = None
+    duration: Optional[float] = None # seconds
+    bitrate: Optional[int] = None # bits per second
+
+
+def _first_tag(tags, key:str) -> str:
+    try:
+        values = tags.get(key) if tags else None
+    except Exception:
+        return ''
+    if not values:
+        return ''
+    return str(values[0]).strip()
+
+
+def _tracknumber(value:str) -> Optional[int]:
+    """Parse '3' or '3/12' into 3."""
+    try:
+        return int(value.split('/')[0])
+    except (ValueError, AttributeError):
+        return None
+
+
+def read_metadata(path:str) -> TrackMetadata:
+    """Extract tags and duration of an audio file with mutagen."""
+    import mutagen # heavy: loaded on first cache miss
+    try:
+        audio = mutagen.File(path, easy=True)
+    except Exception:
+        audio = None
+    if audio is None:
+        return TrackMetadata()
+
+    tags = audio.tags
+    info = getattr(audio, 'info', None)
+    return TrackMetadata(
+        artist=_first_tag(tags, 'artist'),
+        album=_first_tag(tags, 'album'),
+        title=_first_tag(tags, 'title'),
+        tracknumber=_tracknumber(_first_tag(tags, 'tracknumber')),
+        duration=getattr(info, 'length', None),
+        bitrate=getattr(info, 'bitrate', None),
+    )
+
+
+class MetadataCache:
+    """
+    Persistent cache of track metadata keyed by (path, mtime, size).
+
+    Files are only opened when they are missing from the cache or changed
+    since they were read. Misses are extracted in a worker pool.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS metadata (
+            path TEXT PRIMARY KEY,
+            mtime INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            artist TEXT,
+            album TEXT,
+            title TEXT,
+            tracknumber INTEGER,
+            duration REAL,
+            bitrate INTEGER
+        );
+    """
+
+    def __init__(self, db_path:Path, workers:int|None=None):
+        """
+        db_path: sqlite database file holding the cache
+        workers: size of the extraction pool (default: based on CPU count)
+        """
+        self.db_path = db_path
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._db.executescript(self._SCHEMA)
+
+    def get_many(self, files:list[tuple[str, int, int]]) -> dict[str, TrackMetadata]:
+        """
+        Return metadata for (path, mtime, size) triples, reading only stale entries.
+        """
+        result = {}
+        stale = []
+
+        with self._lock:
+            for path, mtime, size in files:
+                row = self._db.execute(
+                    "SELECT mtime, size, artist, album, title, tracknumber, duration, bitrate "
+                    "FROM metadata WHERE path = ?",
+                    (path,)
+                ).fetchone()
+                if row and row[0] == mtime and row[1] == size:
+                    result[path] = TrackMetadata(*row[2:])
+                else:
+                    stale.append((path, mtime, size))
+
+        if not stale:
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            extracted = list(pool.map(read_metadata, (p for p, _, _ in stale)))
+
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO metadata "
+                "(path, mtime, size, artist, album, title, tracknumber, duration, bitrate) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(p, m, s, *md) for (p, m, s), md in zip(stale, extracted)]
+            )
+            self._db.commit()
+
+        for (path, _, _), md in zip(stale, extracted):
+            result[path] = md
+        return result
+
+    def get_cached(self) -> dict[str, tuple[int, TrackMetadata]]:
+        """Return (mtime, metadata) of every cached path, without opening any file."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, mtime, artist, album, title, tracknumber, duration, bitrate FROM metadata"
+            ).fetchall()
+        return {r[0]: (r[1], TrackMetadata(*r[2:])) for r in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
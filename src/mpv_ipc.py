@@ -0,0 +1,197 @@
+"""mpv_ipc.py"""
+import asyncio
+import itertools
+import json
+import socket
+import threading
+from typing import Callable, Optional
+
+import tracing
+
+
+class _Pending:
+    """A caller waiting for the reply to one request."""
+    __slots__ = ("event", "reply")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.reply: Optional[dict] = None
+
+
+class MpvConnection:
+    """
+    Long-lived connection to mpv's JSON IPC server.
+
+    Every command is tagged with a request_id so replies can be routed back
+    to the caller waiting for them, while events are interleaved on the same
+    stream and handed to on_event.
+
+    The stream is read by an asyncio loop running in a daemon thread. on_event
+    is called from that loop, so it must be quick and never wait on a reply.
+    """
+
+    _READ_SIZE = 64 * 1024
+
+    def __init__(self, path:str, on_event:Optional[Callable[[dict], None]]=None, timeout:float=5.0):
+        """
+        path: UNIX socket path of the mpv IPC server
+        on_event: called from the reader loop with every event object
+        timeout: default seconds to wait for connection and replies
+        """
+        self.path = path
+        self.on_event = on_event
+        self.timeout = timeout
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader: Optional[threading.Thread] = None
+        self._connected = False
+
+        self._pending: dict[int, _Pending] = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def connect(self) -> None:
+        """Connect to mpv and start reading replies and events."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        sock.setblocking(False)
+
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._reader = threading.Thread(target=self._run_loop, args=(sock, ready), daemon=True)
+        self._reader.start()
+        if not ready.wait(self.timeout) or not self._connected:
+            self.close()
+            raise ConnectionError(f"IPC reader for {self.path} did not start")
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def close(self) -> None:
+        """Close the connection and release every waiting caller."""
+        was_connected, self._connected = self._connected, False
+        if was_connected and self._writer:
+            try:
+                # closing the transport feeds EOF to the reader, which ends the loop
+                self._loop.call_soon_threadsafe(self._writer.close)
+            except RuntimeError:
+                pass # loop already closed
+        self._fail_pending()
+
+    # -------------------------
+    # commands
+    # -------------------------
+    def _write(self, payload:dict) -> bool:
+        if not self._connected:
+            return False
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        try:
+            # writes are queued in order on the loop; the transport buffers them
+            self._loop.call_soon_threadsafe(self._writer.write, data)
+            return True
+        except RuntimeError:
+            self.close()
+            return False
+
+    def send(self, command:list) -> bool:
+        """Fire-and-forget: send a command without waiting for its reply."""
+        return self._write({"command": command, "request_id": next(self._ids)})
+
+    def request(self, command:list, timeout:float|None=None) -> dict|None:
+        """
+        Send a command and wait for its reply.
+        Returns the reply (dict), or None on timeout or disconnection.
+        """
+        with tracing.span("ipc.request", command=str(command[0]) if command else ''):
+            return self._request(command, timeout)
+
+    def _request(self, command:list, timeout:float|None) -> dict|None:
+        request_id = next(self._ids)
+        pending = _Pending()
+        with self._pending_lock:
+            self._pending[request_id] = pending
+        try:
+            if not self._write({"command": command, "request_id": request_id}):
+                return None
+            pending.event.wait(self.timeout if timeout is None else timeout)
+            return pending.reply
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+
+    def _fail_pending(self) -> None:
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        for p in pending:
+            p.event.set()
+
+    # -------------------------
+    # reader
+    # -------------------------
+    def _run_loop(self, sock:socket.socket, ready:threading.Event) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._read(sock, ready))
+        except Exception:
+            pass
+        finally:
+            self._connected = False
+            self._fail_pending()
+            self._loop.close()
+            ready.set()
+
+    async def _read(self, sock:socket.socket, ready:threading.Event) -> None:
+        reader, self._writer = await asyncio.open_unix_connection(sock=sock)
+        self._connected = True
+        ready.set()
+
+        buf = bytearray()
+        start = 0 # first unconsumed byte
+        while self._connected:
+            chunk = await reader.read(self._READ_SIZE)
+            if not chunk:
+                break
+            scanned = len(buf) # bytes before this chunk hold no newline
+            buf += chunk
+
+            # parse lines in place by offset instead of re-slicing the buffer per line
+            while True:
+                end = buf.find(b"\n", scanned)
+                if end < 0:
+                    break
+                if end > start:
+                    self._dispatch(bytes(buf[start:end]))
+                start = scanned = end + 1
+
+            # drop consumed bytes once per read, not once per line
+            if start:
+                del buf[:start]
+                start = 0
+
+        self._writer.close()
+
+    def _dispatch(self, line:bytes) -> None:
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            return
+
+        if "event" in obj:
+            if self.on_event:
+                try:
+                    self.on_event(obj)
+                except Exception:
+                    pass
+            return
+
+        with self._pending_lock:
+            pending = self._pending.get(obj.get("request_id"))
+        if pending:
+            pending.reply = obj
+            pending.event.set()
@@ -0,0 +1,170 @@
+"""origin_index.py"""
+import os
+import platform
+import sqlite3
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+from library_index import LibraryIndex
+
+
+def read_origin_url(path:str) -> Optional[str]:
+    """Read the source URL stored in a file's xattr metadata by Download, if any."""
+    try:
+        match platform.system():
+            case "Linux":
+                return os.getxattr(path, "user.xdg.origin.url").decode("utf-8")
+            case "Darwin":
+                out = subprocess.run(
+                    ["xattr", "-p", "com.apple.metadata:kMDItemWhereFroms", path],
+                    capture_output=True, text=True, check=False
+                )
+                return (out.stdout.strip() or None) if out.returncode == 0 else None
+            case "Windows":
+                with open(path + ":xdg.origin.url", "r", encoding="utf-8") as ads:
+                    return ads.read().strip() or None
+            case _:
+                return None
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def video_id(url:str) -> Optional[str]:
+    """Return the YouTube video id of a URL, or None if it is not a video URL."""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+    host = (parsed.hostname or '').lower()
+    if host == "youtu.be":
+        return parsed.path.strip('/').split('/')[0] or None
+    if host.endswith("youtube.com"):
+        if parsed.path == "/watch":
+            return (parse_qs(parsed.query).get('v') or [None])[0]
+        parts = parsed.path.strip('/').split('/')
+        if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+            return parts[1]
+    return None
+
+
+class OriginIndex:
+    """
+    Index from source URL (and video id) to library paths.
+
+    Seeded (in the background) from the origin xattrs Download writes on every
+    file, and updated on each download, so batch downloads can skip tracks
+    already present.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS origins (
+            path TEXT PRIMARY KEY,
+            mtime INTEGER NOT NULL,
+            url TEXT,
+            video_id TEXT
+        );
+        CREATE INDEX IF NOT EXISTS origins_url ON origins (url);
+        CREATE INDEX IF NOT EXISTS origins_video_id ON origins (video_id);
+    """
+
+    def __init__(self, db_path:Path, library_index:LibraryIndex):
+        """
+        db_path: sqlite database file holding the index
+        library_index: index of the library files to seed from
+        """
+        self.db_path = db_path
+        self.library_index = library_index
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._db.executescript(self._SCHEMA)
+
+        self._seed_lock = threading.Lock()
+        self._seed_thread: threading.Thread|None = None
+
+    def seed(self, batch:int=1000) -> None:
+        """
+        Read origin xattrs of library files that are new or changed since the last seed.
+        Rows are committed every batch files, so lookups see the progress and an
+        interrupted first seed resumes where it stopped.
+        """
+        root = self.library_index.root_path
+        current = {
+            os.path.abspath(os.path.join(root, playlist, t.name)): t.mtime
+            for playlist, t in self.library_index.iter_tracks()
+        }
+
+        with self._lock:
+            known = dict(self._db.execute("SELECT path, mtime FROM origins"))
+            self._db.executemany("DELETE FROM origins WHERE path = ?", [(p,) for p in known.keys() - current.keys()])
+            self._db.commit()
+
+        stale = [p for p, m in current.items() if known.get(p) != m]
+        for i in range(0, len(stale), batch):
+            rows = []
+            for path in stale[i:i + batch]:
+                url = read_origin_url(path)
+                # files without xattr are recorded too, so they are not read again
+                rows.append((path, current[path], url, video_id(url) if url else None))
+            with self._lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO origins (path, mtime, url, video_id) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._db.commit()
+
+    def seed_async(self) -> None:
+        """Seed in a background thread, unless a seed is already running."""
+        with self._seed_lock:
+            if self._seed_thread and self._seed_thread.is_alive():
+                return
+            self._seed_thread = threading.Thread(target=self._seed_quietly, daemon=True)
+            self._seed_thread.start()
+
+    def _seed_quietly(self) -> None:
+        try:
+            self.seed()
+        except Exception as e:
+            print(f"[warn] failed to index downloaded tracks: {e}")
+
+    def wait_seeded(self, timeout:float|None=None) -> bool:
+        """Wait for a background seed started by seed_async(); returns False if it is still running."""
+        with self._seed_lock:
+            thread = self._seed_thread
+        if thread:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def record(self, url:str, path:str) -> None:
+        """Record a downloaded file."""
+        path = os.path.abspath(path)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO origins (path, mtime, url, video_id) VALUES (?, ?, ?, ?)",
+                (path, mtime, url, video_id(url))
+            )
+            self._db.commit()
+
+    def lookup(self, url:str) -> list[str]:
+        """Return existing library paths downloaded from url (or the same video)."""
+        vid = video_id(url)
+        with self._lock:
+            if vid:
+                rows = self._db.execute(
+                    "SELECT path FROM origins WHERE url = ? OR video_id = ?", (url, vid)
+                ).fetchall()
+            else:
+                rows = self._db.execute("SELECT path FROM origins WHERE url = ?", (url,)).fetchall()
+        return [r[0] for r in rows if os.path.isfile(r[0])]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
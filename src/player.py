@@ -1,17 +1,16 @@
 """player.py"""
 
 import subprocess
-import socket
-import json
 import os
+import queue
 import signal
 import time
-import json
-import socket
 import threading
 from typing import Optional, Callable
 
 from settings import Settings
+from mpv_ipc import MpvConnection
+from inotify import Inotify, IN_CREATE, IN_MOVED_TO, IN_ONLYDIR
 
 def _new_process_group():
     """Ensure the child starts in a new process group (Unix)."""
@@ -21,43 +20,58 @@ def _new_process_group():
         pass
 
 class Player:
+    # mpv events we handle; all others are disabled on the IPC connection
+    _WANTED_EVENTS = ("property-change", "start-file", "end-file")
+
     def __init__(
         self,
-        player_cmd: str = Settings.get('player', 'player_cmd'),
-        ipc_socket: str = Settings.get('player', 'ipc_path'),
+        player_cmd: str|None = None,
+        ipc_socket: str|None = None,
         enable_ipc: bool = True,
         disable_video: bool = False,
         socket_timeout: float = 5.0,
-        socket_poll_interval: float = 0.05
+        socket_poll_interval: float = 0.05,
+        event_queue_size: int = 1024
     ):
         """
         Media player controller that spawns a fresh MPV for each play,
         with reliable IPC socket detection without fixed sleeps.
 
         Args:
-            player_cmd: MPV command or path.
-            ipc_socket: UNIX socket path for IPC.
+            player_cmd: MPV command or path (default: [player] player_cmd).
+            ipc_socket: UNIX socket path for IPC (default: [player] ipc_path).
             enable_ipc: Whether to start in IPC mode.
             disable_video: Pass --no-video to MPV.
             socket_timeout: Max seconds to wait for IPC socket creation.
-            socket_poll_interval: Seconds between socket existence polls.
+            socket_poll_interval: Seconds between socket existence polls (without inotify).
+            event_queue_size: Max events waiting for the callback before the oldest are dropped.
         """
-        self.player_cmd = player_cmd
-        self.ipc_socket = ipc_socket
+        self.player_cmd = player_cmd or Settings.get('player', 'player_cmd')
+        self.ipc_socket = ipc_socket or Settings.get('player', 'ipc_path')
         self.enable_ipc = enable_ipc
         self.disable_video = disable_video
         self.process = None
         self.socket_timeout = socket_timeout
         self.socket_poll_interval = socket_poll_interval
+        self.event_queue_size = event_queue_size
+
+        # persistent IPC connection: replies are routed by request_id, events are queued
+        self._conn: Optional[MpvConnection] = None
+        self._events: queue.Queue = queue.Queue()
+        self.dropped_events = 0 # events discarded because the callback fell behind
+
+        # serializes process start (e.g. prewarm thread vs first play)
+        self._start_lock = threading.RLock()
+        self._prewarm_thread: Optional[threading.Thread] = None
 
         # Event / property thread + state
         self._event_thread: Optional[threading.Thread] = None
-        self._event_thread_stop = threading.Event()
         self._props_lock = threading.Lock()
         self._props_cv = threading.Condition(self._props_lock)
 
         # properties we track: 'playlist-count' and 'playlist-pos' (kept as ints or None)
-        self._props = {"playlist-count": 0, "playlist-pos": None}
+        # and 'playlist' (list of entries as pushed by mpv)
+        self._props = {"playlist-count": 0, "playlist-pos": None, "playlist": []}
 
         # optional external callback for every mpv event (useful for debugging)
         self._event_callback: Optional[Callable[[dict], None]] = None
@@ -96,96 +110,134 @@ class Player:
 
     def _start_process(self, target: str):
         """Spawn MPV, then wait for the IPC socket to appear."""
-        # Tear down any existing player
-        self.stop()
-        cmd = self._build_cmd(target)
-
-        self.process = subprocess.Popen(
-            cmd,
-            stdin=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            preexec_fn=_new_process_group
-        )
+        with self._start_lock:
+            # Tear down any existing player
+            self.stop()
+            cmd = self._build_cmd(target)
 
-        if self.enable_ipc:
-            self._wait_for_socket()
-            self._ensure_event_thread_and_observers()
+            # watch for the socket before mpv can create it
+            inotify = self._watch_socket_dir() if self.enable_ipc else None
+            try:
+                self.process = subprocess.Popen(
+                    cmd,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    preexec_fn=_new_process_group
+                )
+
+                # properties observed from a previous process are stale
+                self._update_prop("playlist-count", 0)
+                self._update_prop("playlist-pos", None)
+                self._update_prop("playlist", [])
+
+                if self.enable_ipc:
+                    self._wait_for_socket(inotify)
+                    self._connect_when_listening()
+            finally:
+                if inotify:
+                    inotify.close()
+
+    def _watch_socket_dir(self) -> Optional[Inotify]:
+        """Return an inotify watching the IPC socket's directory, or None if unsupported."""
+        try:
+            inotify = Inotify()
+        except OSError:
+            return None
+        try:
+            inotify.add_watch(os.path.dirname(os.path.abspath(self.ipc_socket)), IN_CREATE | IN_MOVED_TO | IN_ONLYDIR)
+        except OSError:
+            inotify.close()
+            return None
+        return inotify
 
-    def _wait_for_socket(self):
-        """Wait up to socket_timeout for the IPC socket file."""
+    def _wait_for_socket(self, inotify:Optional[Inotify]=None):
+        """
+        Wait up to socket_timeout for the IPC socket file.
+        With inotify the creation event is awaited; otherwise the path is polled.
+        """
         deadline = time.monotonic() + self.socket_timeout
+        name = os.path.basename(self.ipc_socket)
         while time.monotonic() < deadline:
             if os.path.exists(self.ipc_socket):
                 return
-            time.sleep(self.socket_poll_interval)
+            if self.process and self.process.poll() is not None:
+                raise RuntimeError(f"{self.player_cmd} exited before creating its IPC socket")
+            if inotify:
+                # wake up on directory events, or periodically to notice a dead mpv
+                remaining = deadline - time.monotonic()
+                events = inotify.read(timeout=max(0.0, min(0.5, remaining)))
+                if any(ev_name == name for _, _, _, ev_name in events):
+                    return
+            else:
+                time.sleep(self.socket_poll_interval)
         raise TimeoutError(f"IPC socket not created within {self.socket_timeout}s")
 
-    def _send_command(self, command: list):
-        if not self.enable_ipc or not self.process:
+    def _connect_when_listening(self):
+        """Connect to the socket; mpv may have bound it but not be listening yet."""
+        deadline = time.monotonic() + self.socket_timeout
+        while True:
+            self._ensure_event_thread_and_observers()
+            if (self._conn and self._conn.is_connected()) or time.monotonic() >= deadline:
+                return
+            time.sleep(0.01)
+
+    def prewarm(self) -> None:
+        """Start an idle mpv in the background so the first play has no spawn latency."""
+        if not self.enable_ipc or self.is_playing():
             return
-        try:
-            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
-                sock.connect(self.ipc_socket)
-                payload = json.dumps({"command": command}) + "\n"
-                sock.sendall(payload.encode('utf-8'))
-        except Exception:
-            # Could log or retry here if needed
-            pass
+        if self._prewarm_thread and self._prewarm_thread.is_alive():
+            return
+
+        def run():
+            try:
+                self.start_idle()
+            except Exception:
+                # the first play will start mpv itself
+                pass
+
+        self._prewarm_thread = threading.Thread(target=run, daemon=True)
+        self._prewarm_thread.start()
+
+    def _send_command(self, command: list):
+        self.ipc_send(command)
 
     # -------------------------
     # low-level IPC send/request
     # -------------------------
-    def _open_ipc(self, timeout=None):
-        """Return a connected UNIX socket. Caller must close it (use with)."""
-        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        sock.settimeout(timeout or self.socket_timeout)
-        sock.connect(self.ipc_socket)
-        return sock
+    def _ipc(self) -> Optional[MpvConnection]:
+        """Return the persistent IPC connection, reconnecting if mpv is still alive."""
+        if not self.enable_ipc or not self.process:
+            return None
+        conn = self._conn
+        if conn and conn.is_connected():
+            return conn
+        # reconnecting races with a start or stop in another thread
+        with self._start_lock:
+            if not self.is_playing():
+                return None
+            self._ensure_event_thread_and_observers()
+            return self._conn
 
     def ipc_send(self, command: list) -> None:
         """
         Fire-and-forget: send a JSON IPC command (no reply required).
         Safe to call whether mpv is running or not (it will silently return).
         """
-        if not self.enable_ipc or not self.process:
-            return
-        try:
-            with self._open_ipc() as sock:
-                payload = json.dumps({"command": command}) + "\n"
-                sock.sendall(payload.encode("utf-8"))
-        except Exception:
-            # ignore; caller can fallback / detect via properties
-            pass
+        conn = self._ipc()
+        if conn:
+            # ignore failures; caller can fallback / detect via properties
+            conn.send(command)
 
     def ipc_request(self, command:list, timeout:float|None=None) -> dict|None:
         """
         Send a JSON IPC command and return the parsed JSON reply (dict), or None on error.
-        Blocks until one JSON line is returned or socket timeout.
+        Blocks until the reply carrying our request_id arrives or timeout.
         """
-        if not self.enable_ipc or not self.process:
-            return None
-        try:
-            with self._open_ipc(timeout) as sock:
-                payload = json.dumps({"command": command}) + "\n"
-                sock.sendall(payload.encode("utf-8"))
-
-                # read until newline then parse JSON
-                data = bytearray()
-                while True:
-                    chunk = sock.recv(4096)
-                    if not chunk:
-                        break
-                    data.extend(chunk)
-                    if data.endswith(b"\n"):
-                        break
-                if not data:
-                    return None
-                # mpv replies may send multiple lines; parse the first complete JSON object
-                line = data.splitlines()[0].decode("utf-8", errors="ignore").strip()
-                return json.loads(line)
-        except Exception:
+        conn = self._ipc()
+        if not conn:
             return None
+        return conn.request(command, timeout or self.socket_timeout)
 
     # -------------------------
     # property helpers + waiting
@@ -244,14 +296,43 @@ class Player:
     # event thread & observation
     # -------------------------
     def _ensure_event_thread_and_observers(self):
-        """Start event thread if missing and request observe_property for props."""
-        # start event thread
-        if self._event_thread is None or not self._event_thread.is_alive():
-            self._event_thread_stop.clear()
-            self._event_thread = threading.Thread(target=self._event_loop, daemon=True)
-            self._event_thread.start()
-            # give it a small moment to connect and subscribe
-            time.sleep(0.05)
+        """Open the IPC connection, request observe_property for props and start the event thread."""
+        if self._conn and self._conn.is_connected():
+            return
+
+        self._stop_event_thread()
+
+        # a fresh queue per connection so a lingering thread never steals events
+        self._events = queue.Queue(maxsize=self.event_queue_size)
+        conn = MpvConnection(self.ipc_socket, on_event=self._on_ipc_event, timeout=self.socket_timeout)
+        try:
+            conn.connect()
+        except OSError:
+            return
+        self._conn = conn
+
+        self._event_thread = threading.Thread(target=self._event_loop, args=(self._events,), daemon=True)
+        self._event_thread.start()
+
+        # only receive the events we handle (property-change included)
+        conn.request(["disable_event", "all"])
+        for name in self._WANTED_EVENTS:
+            conn.request(["enable_event", name])
+
+        # replies are awaited, so properties are observed once this returns
+        conn.request(["observe_property", 1, "playlist-count"])
+        conn.request(["observe_property", 2, "playlist-pos"])
+        # the whole playlist is pushed on change, so the queue can be mirrored without polling
+        conn.request(["observe_property", 3, "playlist"])
+
+    def _stop_event_thread(self):
+        if self._event_thread and self._event_thread.is_alive():
+            self._enqueue_event(None)
+            # a callback may reconnect from the event thread itself: it exits
+            # on the sentinel once the callback returns
+            if threading.current_thread() is not self._event_thread:
+                self._event_thread.join(timeout=1.0)
+        self._event_thread = None
 
     def start_event_loop(self, callback: Optional[Callable[[dict], None]] = None):
         """
@@ -260,75 +341,57 @@ class Player:
         """
         self._event_callback = callback
         if self.process and self.enable_ipc:
-            self._ensure_event_thread_and_observers()
+            with self._start_lock:
+                self._ensure_event_thread_and_observers()
+
+    def _enqueue_event(self, obj:dict|None):
+        """Queue an event for the callback thread, dropping the oldest one if full."""
+        while True:
+            try:
+                self._events.put_nowait(obj)
+                return
+            except queue.Full:
+                try:
+                    self._events.get_nowait()
+                    self.dropped_events += 1
+                except queue.Empty:
+                    pass
 
-    def _event_loop(self):
+    def _on_ipc_event(self, obj:dict):
         """
-        Connect to mpv IPC socket and continuously receive newline-delimited JSON events.
-        We also send observe_property commands on connect so property-change arrives.
+        Called by the IPC reader for every event. Tracked properties are updated
+        right away so waiters never depend on the callback; the callback itself
+        runs on the event thread.
         """
-        # keep trying until told to stop
-        while not self._event_thread_stop.is_set():
+        # handle property-change events
+        if obj.get("event") == "property-change":
+            name = obj.get("name")
+            if name:
+                self._update_prop(name, obj.get("data"))
+        elif obj.get("event") == "start-file":
+            # start-file often contains playlist-pos
+            pos = obj.get("playlist-pos")
+            if pos is not None:
+                self._update_prop("playlist-pos", pos)
+        # playlist-count is observed: no need to query it on start-file/end-file
+
+        if self._event_callback:
+            self._enqueue_event(obj)
+
+    def _event_loop(self, events:queue.Queue):
+        """
+        Run the external callback for queued events until a None sentinel arrives.
+        Runs outside the reader, so callbacks may be slow or issue IPC requests.
+        """
+        while True:
+            obj = events.get()
+            if obj is None:
+                break
             try:
-                with self._open_ipc(timeout=None) as sock:
-                    # on connect request observes for playlist-count and playlist-pos
-                    # choose arbitrary request ids
-                    sock.sendall((json.dumps({"command":["observe_property", 1, "playlist-count"]}) + "\n").encode("utf-8"))
-                    sock.sendall((json.dumps({"command":["observe_property", 2, "playlist-pos"]}) + "\n").encode("utf-8"))
-                    # read loop
-                    buf = bytearray()
-                    while not self._event_thread_stop.is_set():
-                        chunk = sock.recv(4096)
-                        if not chunk:
-                            break
-                        buf.extend(chunk)
-                        while b"\n" in buf:
-                            line, _, rest = buf.partition(b"\n")
-                            buf = bytearray(rest)
-                            if not line:
-                                continue
-                            try:
-                                obj = json.loads(line.decode("utf-8", errors="ignore"))
-                            except Exception:
-                                continue
-                            # optional external callback for debugging
-                            try:
-                                if self._event_callback:
-                                    try:
-                                        self._event_callback(obj)
-                                    except Exception:
-                                        pass
-                            except Exception:
-                                pass
-                            # handle property-change events
-                            if obj.get("event") == "property-change":
-                                name = obj.get("name")
-                                if name:
-                                    self._update_prop(name, obj.get("data"))
-                            elif obj.get("event") == "start-file":
-                                # start-file often contains playlist-pos
-                                pos = obj.get("playlist-pos")
-                                if pos is not None:
-                                    self._update_prop("playlist-pos", pos)
-                                # also refresh playlist-count from mpv
-                                pc = self.get_property("playlist-count")
-                                if pc is not None:
-                                    self._update_prop("playlist-count", pc)
-                            elif obj.get("event") == "end-file":
-                                # on end-file we don't mutate internal state here; event caller may use it
-                                # but update playlist-count just in case
-                                pc = self.get_property("playlist-count")
-                                if pc is not None:
-                                    self._update_prop("playlist-count", pc)
-                            # other events ignored here
-            except FileNotFoundError:
-                # socket missing: wait and retry
-                time.sleep(0.05)
-            except ConnectionRefusedError:
-                time.sleep(0.05)
+                if self._event_callback:
+                    self._event_callback(obj)
             except Exception:
-                # generic backoff to avoid tight loop
-                time.sleep(0.1)
+                pass
         # thread exit
 
     # -------------------------
@@ -340,24 +403,17 @@ class Player:
 
     def start_idle(self):
         """Ensure mpv is running and in idle mode (no file loaded)."""
-        if not self.is_playing():
-            # start mpv in idle mode
-            self._start_process(target=None)
+        with self._start_lock:
+            if not self.is_playing():
+                # start mpv in idle mode
+                self._start_process(target=None)
 
     def play_track(self, filepath:str) -> None:
         """Load or reload a local file. If enable_ipc: send loadfile replace (starting mpv if necessary)."""
         if self.enable_ipc:
-            if not self.is_playing():
-                # start mpv idle then load
-                self.start_idle()
-
-                # wait up to socket timeout for playlist to initialize (some mpv versions)
-                self.wait_for_playlist_count(0)
-
-                # request loadfile replace
-                self.ipc_send(["loadfile", filepath, "replace"])
-            else:
-                self.ipc_send(["loadfile", filepath, "replace"])
+            # starts mpv idle if needed, or waits for a prewarm still connecting
+            self.start_idle()
+            self.ipc_send(["loadfile", filepath, "replace"])
         else:
             subprocess.Popen(self._build_cmd(filepath), preexec_fn=_new_process_group if os.name != "nt" else None)
 
@@ -368,25 +424,26 @@ class Player:
 
     def stop(self) -> None:
         """Terminate MPV and clean up socket and event thread."""
-        # signal event thread to stop first
-        self._event_thread_stop.set()
-        if self._event_thread and self._event_thread.is_alive():
-            # give the thread a small chance to exit
-            time.sleep(0.05)
-
-        if self.process:
-            try:
-                os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
-            except Exception:
+        with self._start_lock:
+            # close the IPC connection and let the event thread drain first
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+            self._stop_event_thread()
+
+            if self.process:
+                try:
+                    os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
+                except Exception:
+                    try:
+                        self.process.terminate()
+                    except Exception:
+                        pass
                 try:
-                    self.process.terminate()
+                    self.process.wait(timeout=1.0)
                 except Exception:
                     pass
-            try:
-                self.process.wait(timeout=1.0)
-            except Exception:
-                pass
-            self.process = None
+                self.process = None
 
-        if self.enable_ipc:
-            self._cleanup_socket()
+            if self.enable_ipc:
+                self._cleanup_socket()
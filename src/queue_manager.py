@@ -1,9 +1,32 @@
 """queue_manager.py"""
 import os
-from typing import List, Optional
+from typing import Callable, List, Optional, Sequence
 from player import Player
+from settings import Settings
+
+import tempfile
+import threading
+import tracing
+
+class _QueueWindow:
+    """Tracks played in windowed mode: tracks from start on, wrapping around."""
+    __slots__ = ("tracks", "start", "path_of", "size", "loaded")
+
+    def __init__(self, tracks:Sequence[str], start:int, path_of:Callable[[str], str], size:int):
+        self.tracks = tracks
+        self.start = start
+        self.path_of = path_of
+        self.size = size # items kept loaded ahead of (and behind) the current one
+        self.loaded = 0 # items handed to mpv so far
+
+    def paths(self, count:int) -> List[str]:
+        """Return the paths of the next count items not loaded yet."""
+        n = len(self.tracks)
+        end = min(n, self.loaded + count)
+        paths = [self.path_of(self.tracks[(self.start + k) % n]) for k in range(self.loaded, end)]
+        self.loaded = end
+        return paths
 
-import threading, time
 
 class QueueManager:
     """
@@ -18,8 +41,12 @@ class QueueManager:
 
         self._loading = False
 
+        # windowed mode: only the next items of a large playlist are loaded in mpv
+        self._window:Optional[_QueueWindow] = None
+        self._window_lock = threading.Lock()
+
         self.player.start_event_loop(self._on_mpv_event) # start event loop in player and forward events to our handler
-        self._current_pos:Optional[int] = None # cached mpv playlist-pos (updated on start-file)
+        self._current_pos:Optional[int] = None # cached mpv playlist-pos (updated from the observed property)
 
     def _abs(self, path:str) -> str:
         return os.path.abspath(path) if not (path.startswith("http://") or path.startswith("https://")) else path
@@ -27,13 +54,34 @@ class QueueManager:
     # -------------------------
     # core operations (safe)
     # -------------------------
+    def _loadlist(self, paths:List[str]) -> None:
+        """Append paths to mpv's playlist in one command, through an m3u8 playlist file."""
+        # a file per call: mpv may still be reading the one of a previous loadlist
+        fd, playlist_file = tempfile.mkstemp(prefix="musicli-queue-", suffix=".m3u8")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("#EXTM3U\n")
+            for p in paths:
+                f.write(p + "\n")
+        try:
+            self.player.ipc_request(["loadlist", playlist_file, "append"])
+        finally:
+            # read once mpv replied; after a timeout the command is never retried
+            os.unlink(playlist_file)
+
+    @tracing.traced("queue.load_queue")
     def load_queue(self, paths:List[str]) -> None:
         """
         Replace current queue and start playing at paths[0].
+        The remaining items are handed to mpv at once through a playlist file,
+        then the queue is reconciled with a single wait.
         """
         if not paths:
             return
 
+        # an explicit queue replaces any windowed playlist
+        with self._window_lock:
+            self._window = None
+
         abs_paths = [self._abs(p) for p in paths]
 
         self._loading = True
@@ -42,29 +90,16 @@ class QueueManager:
             # ensure mpv running
             self.player.start_idle()
 
-            # replace with the first item
+            # replace with the first item so playback starts immediately
             self.player.ipc_send(["loadfile", abs_paths[0], "replace"])
 
-            # wait until mpv reports playlist-count >= 1
-            if not self.player.wait_for_playlist_count(1):
-                print("[queue] warning: mpv did not report 1 playlist item in time")
-
-            # append remaining items, waiting for playlist-count increments
-            base_count = int(self.player.get_property("playlist-count") or 0)
-
-            for p in abs_paths[1:]:
-                # send append and wait for playlist-count to increase by 1
-                self.player.ipc_send(["loadfile", p, "append"])
-                
-                wanted = base_count + 1
-
-                if self.player.wait_for_playlist_count(wanted):
-                    base_count = wanted
-                else:
-                    # fallback: short sleep and attempt to continue; also sync from mpv
-                    print(f"[queue] warning: append not observed in time for {p}")
-                    time.sleep(0.1)
-            
+            # append everything else in one command
+            if len(abs_paths) > 1:
+                self._loadlist(abs_paths[1:])
+
+            if not self.player.wait_for_playlist_count(len(abs_paths), timeout=self.player.socket_timeout):
+                print(f"[queue] warning: mpv did not report {len(abs_paths)} playlist items in time")
+
             # reconciliation with mpv
             self.sync_from_mpv(abs_paths.copy())
 
@@ -72,19 +107,82 @@ class QueueManager:
             # clear loading guard in all cases so event thread resumes normal sync
             self._loading = False
 
+    def _playlist_count(self) -> int:
+        try:
+            return int(self.player.get_property("playlist-count") or 0)
+        except Exception:
+            return 0
+
+    @staticmethod
+    def window_size() -> int:
+        """Return [player] queue_window, or 0 (whole playlist) if it is not a number."""
+        value = Settings.get('player', 'queue_window')
+        try:
+            return max(0, int(value))
+        except ValueError:
+            print(f"[warn] invalid [player] queue_window {value!r}, loading whole playlists")
+            return 0
+
+    def load_window(self, tracks:Sequence[str], start:int=0, path_of:Callable[[str], str]|None=None, size:int|None=None) -> None:
+        """
+        Play tracks from tracks[start] on (wrapping around), keeping only the
+        next size items loaded in mpv. More are appended as playback advances
+        (playlist-pos changes) and played ones beyond size are dropped, so the
+        cost of starting and mpv's playlist stay bounded whatever len(tracks) is.
+
+        path_of: maps an item of tracks to the path mpv loads (only called for loaded items)
+        size: window size (default: [player] queue_window)
+        """
+        if not tracks:
+            return
+        if size is None:
+            size = self.window_size()
+        window = _QueueWindow(tracks, start, path_of or self._abs, max(1, size))
+
+        # the current item and the window ahead of it
+        self.load_queue(window.paths(window.size + 1))
+        with self._window_lock:
+            self._window = window
+
+    def _advance_window(self) -> None:
+        """Top up the items ahead of the current one to the window size, and drop old played ones."""
+        with self._window_lock:
+            window = self._window
+            if window is None:
+                return
+            # queried rather than taken from the event: removals below shift it
+            # again before their own property-change events arrive
+            pos = self.current_index()
+            if pos is None or pos < 0:
+                return
+            count = self._playlist_count()
+
+            ahead = count - 1 - pos
+            if ahead < window.size:
+                paths = window.paths(window.size - ahead)
+                if paths:
+                    self._loadlist(paths)
+                    with self._lock:
+                        self.queue.extend(paths)
+
+            # keep at most size played items for playlist-prev
+            removed = max(0, pos - window.size)
+            for _ in range(removed):
+                self.remove_at(0)
+            # the current item moved up by as many (its playlist-pos event follows)
+            self._current_pos = pos - removed
+
     def append(self, path:str, play_now:bool=False) -> None:
         """Append path to the end of the queue in a safe manner."""
         p = self._abs(path)
         with self._lock:
             self.queue.append(p)
+        # count before sending: read afterwards, it may already include the new item
+        cur = self._playlist_count()
         mode = "append-play" if play_now else "append"
         self.player.ipc_send(["loadfile", p, mode])
         # if not play_now, we can optionally wait for playlist-count change
         if not play_now:
-            try:
-                cur = int(self.player.get_property("playlist-count") or 0)
-            except Exception:
-                cur = 0
             self.player.wait_for_playlist_count(cur + 1, timeout=2.0)
 
     def insert_at(self, index:int, path:str, play_now:bool = False) -> None:
@@ -99,14 +197,11 @@ class QueueManager:
                 self.player.ipc_send(["loadfile", p, mode])
                 return
             self.queue.insert(index, p)
+        cur = self._playlist_count()
         mode = "insert-at-play" if play_now else "insert-at"
         # send insert-at (mpv >= 0.38) - if not supported, mpv will error; could fallback to append+move
         self.player.ipc_send(["loadfile", p, mode, str(index)])
         # best-effort wait (playlist-count should rise)
-        try:
-            cur = int(self.player.get_property("playlist-count") or 0)
-        except Exception:
-            cur = 0
         self.player.wait_for_playlist_count(cur + 1, timeout=2.0)
 
     def remove_at(self, index: int) -> None:
@@ -157,43 +252,47 @@ class QueueManager:
     # -------------------------
     # sync helpers & events
     # -------------------------
-    def sync_from_mpv(self, fallback:List[str]=[]) -> None:
-        """
-        Query mpv's playlist items and rebuild our internal queue to match the mpv order.
-        This uses get_property for playlist-count and playlist/<i>/filename.
-        """
-
-        try:
-            count = int(self.player.get_property("playlist-count") or 0)
-        except Exception:
-            count = 0
-
-        new_q = []
-
-        for i in range(count):
-            fname = self.player.get_property(f"playlist/{i}/filename")
-            if not fname:
-                fname = self.player.get_property(f"playlist/{i}/path") or self.player.get_property(f"playlist/{i}/title")
-            if fname:
-                new_q.append(fname)
+    @staticmethod
+    def _entry_path(entry:dict) -> Optional[str]:
+        return entry.get("filename") or entry.get("title")
 
+    def _apply_playlist(self, entries:list) -> None:
+        """Mirror an mpv playlist value (list of entries) into our queue."""
+        new_q = [p for p in (self._entry_path(e) for e in entries if isinstance(e, dict)) if p]
         with self._lock:
-            if new_q:
+            if new_q != self.queue:
                 self.queue = new_q
-            else:
+
+    @tracing.traced("queue.sync_from_mpv")
+    def sync_from_mpv(self, fallback:List[str]=[]) -> None:
+        """
+        Query mpv's playlist and rebuild our internal queue to match the mpv order.
+        This is a single get_property of the whole playlist; on changes the
+        event handler mirrors the observed value instead.
+        """
+        entries = self.player.get_property("playlist")
+        if entries:
+            self._apply_playlist(entries)
+        else:
+            with self._lock:
                 self.queue = fallback
 
     def _on_mpv_event(self, obj:dict):
         """
-        MPV event callback from Player. We care about 'start-file' to keep in-sync.
+        MPV event callback from Player. We mirror the observed 'playlist' and
+        'playlist-pos' properties (mpv's start-file only carries the entry id).
         """
-        ev = obj.get("event")
-        if ev == "start-file":
-            pos = obj.get("playlist-pos")
+        if obj.get("event") != "property-change":
+            return
+        name = obj.get("name")
+        if name == "playlist":
+            if isinstance(obj.get("data"), list):
+                self._apply_playlist(obj["data"])
+        elif name == "playlist-pos":
             try:
-                pos = int(pos) if pos is not None else None
-            except Exception:
+                pos = int(obj.get("data"))
+            except (TypeError, ValueError):
                 pos = None
-            self._current_pos = pos
-            # rebuild our queue from mpv (safe point)
-            self.sync_from_mpv()
+            # -1 while nothing is playing
+            self._current_pos = pos if pos is not None and pos >= 0 else None
+            self._advance_window()
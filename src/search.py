@@ -1,35 +1,79 @@
 """search.py"""
-import yt_dlp
+import threading
+from typing import Iterator
 from sanitize_filename import sanitize
 
 from fzf import fzf_select
 from download import Download
 from player import Player
 from settings import Settings
+from search_cache import SearchCache
+from stream_cache import StreamUrlCache
+from ydl_pool import pool
+import tracing
 import utils
 
 class Search:
-    def __init__(self, library, player:Player=Player(), playlist:str=None):
+    # shared by every Search (and SearchFile) instance
+    _cache: SearchCache|None = None
+    _streams = StreamUrlCache()
+
+    # results whose stream URL is resolved in the background once shown
+    _PREFETCH = 3
+    # results added to the menu by each "load more"
+    _PAGE_SIZE = 10
+
+    def __init__(self, library, player:Player|None=None, playlist:str=None):
         """
         library: Library for playlist selection and path management
-        player: Player object for playback
+        player: Player object for playback (a new one if not provided)
         """
         self.library = library
-        self.player = player
+        self.player = player if player is not None else Player()
         self.playlist = playlist
 
         self.last_query = ''
-        self.results_cache = []
-        self.downloader = Download(output_dir=Settings.get('library', 'root_path'))
+
+        # streamed results of the query shown in the menu; a menu closed while
+        # its results were loading may still append one from its feeding thread
+        self._results_lock = threading.Lock()
+        self._stream_lock = threading.Lock() # held while reading the stream, replaced on reset
+        self._results_query = None
+        self._results: list[dict] = []
+        self._results_stream: Iterator[dict]|None = None
+        self._results_done = False
+        self._results_error: Exception|None = None
+        self.downloader = Download(
+            output_dir=Settings.get('library', 'root_path'),
+            origins=getattr(library, 'origins', None)
+        )
 
         self._play_text = "Play"
         self._download_text = "Download"
         self._back_text = "[ Back ]"
+        self._more_text = "[ Load more ]"
+
+    @classmethod
+    def _get_cache(cls) -> SearchCache:
+        if cls._cache is None:
+            cls._cache = SearchCache(
+                Settings.get_config_dir() / 'cache.db',
+                ttl=float(Settings.get('search', 'cache_ttl')),
+                max_entries=int(Settings.get('search', 'cache_size'))
+            )
+        return cls._cache
+
+    @tracing.traced("search.youtube")
+    def _search(self, query:str, max_results:int = 10) -> list[dict]:
+        """
+        Search YouTube for a query, through the persistent search cache.
+        Keeps no instance state, so it is safe to call from worker threads.
+        """
+        cache = self._get_cache()
+        entries = cache.get(query, max_results)
+        if entries is not None:
+            return entries
 
-    def search_youtube(self, query:str, max_results:int = 10) -> list[dict]:
-        """Search YouTube for a query, with simple caching"""
-        if query == self.last_query and self.results_cache:
-            return self.results_cache
         opts = {
             'format': 'bestaudio/best',
             'noplaylist': True,
@@ -37,15 +81,143 @@ class Search:
             'default_search': 'ytsearch',
             'extract_flat': True
         }
-        with yt_dlp.YoutubeDL(opts) as ydl:
+        with pool.borrow('search', opts) as ydl:
             info = ydl.extract_info(f"ytsearch{max_results}:{query}", download=False)
         entries = info.get('entries') or []
-        self.results_cache = entries
+        if entries:
+            cache.put(query, max_results, entries)
         return entries
 
+    def stream_youtube(self, query:str, start:int=0) -> Iterator[dict]:
+        """
+        Yield search results for a query as yt-dlp extracts them, one page of
+        results at a time, from the start-th result on. The first page comes
+        from the persistent search cache when present.
+        """
+        cache = self._get_cache()
+        cached = cache.get(query, self._PAGE_SIZE) or []
+        yield from cached[start:]
+
+        opts = {
+            'format': 'bestaudio/best',
+            'noplaylist': True,
+            'quiet': True,
+            'default_search': 'ytsearch',
+            'extract_flat': True
+        }
+        with pool.borrow('search', opts) as ydl:
+            # process=False keeps the entries a lazy generator: pages are fetched as it is read
+            with tracing.span("search.stream_first_page"):
+                info = ydl.extract_info(f"ytsearchall:{query}", download=False, process=False)
+            first_page = []
+            try:
+                for i, entry in enumerate(info.get('entries') or []):
+                    if not cached and i < self._PAGE_SIZE:
+                        first_page.append(entry)
+                        if len(first_page) == self._PAGE_SIZE:
+                            cache.put(query, self._PAGE_SIZE, first_page)
+                    if i >= max(start, len(cached)):
+                        yield entry
+            except GeneratorExit:
+                # closed by the menu: the YoutubeDL instance stays reusable
+                return
+        if 0 < len(first_page) < self._PAGE_SIZE:
+            # fewer results than a page: the search is complete
+            cache.put(query, self._PAGE_SIZE, first_page)
+
+    def _next_result(self, known:int) -> bool:
+        """
+        Read one more result of the query into self._results, unless it holds
+        more than known already (read by a menu closed meanwhile).
+        Returns False once the results are exhausted or were reset.
+        """
+        with self._results_lock:
+            stream_lock = self._stream_lock
+        with stream_lock:
+            with self._results_lock:
+                if stream_lock is not self._stream_lock:
+                    return False
+                if len(self._results) > known:
+                    return True
+                if self._results_done:
+                    return False
+                if self._results_stream is None:
+                    self._results_stream = self.stream_youtube(self._results_query, start=known)
+                stream = self._results_stream
+
+            try:
+                entry = next(stream, None)
+            except Exception:
+                with self._results_lock:
+                    if stream is self._results_stream:
+                        self._results_stream = None
+                raise
+
+            with self._results_lock:
+                if stream is not self._results_stream:
+                    return False
+                if entry is None:
+                    self._results_done = True
+                    return False
+                self._results.append(entry)
+                count = len(self._results)
+        if count <= self._PREFETCH:
+            self.prefetch_stream_urls([entry])
+        return True
+
+    def _result_options(self, wanted:int) -> Iterator[str]:
+        """
+        Yield the menu lines of the results found so far, then stream new
+        results until wanted are listed, then the load more action.
+        """
+        shown = 0
+        try:
+            while True:
+                with self._results_lock:
+                    found = self._results[shown:]
+                for e in found:
+                    yield self.format_entry(e)
+                shown += len(found)
+                if shown >= wanted or not self._next_result(shown):
+                    break
+        except Exception as e:
+            # shown once the menu closes; the next "load more" starts a new search
+            self._results_error = e
+            return
+
+        if not self._results_done:
+            yield self._more_text
+
+    def _reset_results(self, query:str) -> None:
+        with self._results_lock:
+            stream = self._results_stream
+            self._results_query = query
+            self._results = []
+            self._results_stream = None
+            self._results_done = False
+            # a closed menu's thread may still be reading the old stream
+            self._stream_lock = threading.Lock()
+        if stream is not None:
+            try:
+                stream.close()
+            except ValueError:
+                # being read: dropped once that read returns
+                pass
+
     def get_stream_url(self, video_id:str) -> str:
-        """Get the direct audio stream URL for a video ID"""
-        with yt_dlp.YoutubeDL({'format': 'bestaudio/best', 'quiet': False}) as ydl:
+        """Get the direct audio stream URL for a video ID, reused until it expires"""
+        return self._streams.get(video_id, self._resolve_stream_url)
+
+    def prefetch_stream_urls(self, entries:list[dict]) -> None:
+        """Resolve stream URLs of entries in the background so Play starts at once"""
+        self._streams.prefetch([e.get('id') for e in entries], self._resolve_stream_url)
+
+    @staticmethod
+    @tracing.traced("search.stream_url")
+    def _resolve_stream_url(video_id:str) -> str:
+        # may run in the background while fzf owns the terminal
+        quiet = not Settings.get_bool('app', 'debug')
+        with pool.borrow('stream', {'format': 'bestaudio/best', 'quiet': quiet}) as ydl:
             info = ydl.extract_info(video_id, download=False)
         return info['url']
 
@@ -53,7 +225,12 @@ class Search:
         """Playback via injected player"""
         url = self.get_stream_url(entry['id'])
         print(f"Playing: {entry['title']}")
-        self.player.play_url(url)
+        queue = getattr(self.library, 'queue', None)
+        if queue is not None and queue.player is self.player and self.player.enable_ipc:
+            # replaces the queue, so a windowed library playlist stops being topped up
+            queue.load_queue([url])
+        else:
+            self.player.play_url(url)
 
     def format_entry(self, e:dict) -> str:
         title = e.get('title', 'Unknown')
@@ -73,23 +250,33 @@ class Search:
             if not query:
                 continue
 
-            entries = self.search_youtube(query)
-            if not entries:
-                print("No results found.")
-                continue
+            if query != self._results_query:
+                self._reset_results(query)
+            wanted = max(len(self._results), self._PAGE_SIZE)
 
             while True:
-                options = [self.format_entry(e) for e in entries]
-                
+                # results are listed as they arrive
                 sel = fzf_select(
-                    options,
+                    self._result_options(wanted),
                     multi=True,
                     prompt="Select tracks (TAB select, ENTER to back): "
                 )
+                with self._results_lock:
+                    entries = list(self._results)
+
+                if self._results_error is not None:
+                    print(f"[warn] search failed: {self._results_error}")
+                    self._results_error = None
 
                 if not sel:
+                    if not entries:
+                        print("No results found.")
                     break
 
+                if self._more_text in sel:
+                    wanted = len(entries) + self._PAGE_SIZE
+                    continue
+
                 items = [e for line in sel for e in entries if e['id'] in line]
                 if not items:
                     continue
@@ -100,14 +287,11 @@ class Search:
                         self.playlist = self.library.select_playlist(custom_actions=False)
                     
                     print(f"Downloading {len(items)} tracks to '{self.playlist}'...")
-                    for it in items:
-                        url = it.get('webpage_url') or f"https://youtu.be/{it['id']}"
-                        filename = sanitize(it['title'])
-                        saved = self.downloader.download_url(
-                            url,
-                            subfolder=self.playlist,
-                            filename=filename
-                        )
+                    jobs = [
+                        (it.get('webpage_url') or f"https://youtu.be/{it['id']}", self.playlist, sanitize(it['title']))
+                        for it in items
+                    ]
+                    for saved in self.downloader.download_batch(jobs):
                         print(f"Saved to {saved}")
                     print("End of download(s).")
                     input("Press Enter to continue...")
@@ -115,6 +299,7 @@ class Search:
 
                 # single item: choose action
                 entry = items[0]
+                self.prefetch_stream_urls([entry])
                 action = fzf_select(
                     [self._play_text, self._download_text, self._back_text],
                     multi=False,
@@ -0,0 +1,95 @@
+"""search_cache.py"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class SearchCache:
+    """
+    Persistent cache of search results keyed by (query, max_results).
+
+    Entries expire after ttl seconds; beyond max_entries, the least recently
+    used ones are evicted. A cached search with more results also answers a
+    smaller one for the same query.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS searches (
+            query TEXT NOT NULL,
+            max_results INTEGER NOT NULL,
+            entries TEXT NOT NULL,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL,
+            PRIMARY KEY (query, max_results)
+        );
+        CREATE INDEX IF NOT EXISTS searches_accessed ON searches (accessed);
+    """
+
+    def __init__(self, db_path:Path, ttl:float, max_entries:int):
+        """
+        db_path: sqlite database file holding the cache
+        ttl: seconds a result stays valid
+        max_entries: number of searches kept
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._db.executescript(self._SCHEMA)
+
+    @staticmethod
+    def _key(query:str) -> str:
+        return " ".join(query.split()).casefold()
+
+    def get(self, query:str, max_results:int) -> list[dict]|None:
+        """Return cached entries for a search, or None if missing or expired."""
+        now = time.time()
+        key = self._key(query)
+        with self._lock:
+            self._db.execute("DELETE FROM searches WHERE created < ?", (now - self.ttl,))
+            row = self._db.execute(
+                "SELECT max_results, entries FROM searches WHERE query = ? AND max_results >= ? "
+                "ORDER BY max_results LIMIT 1",
+                (key, max_results)
+            ).fetchone()
+            if row:
+                self._db.execute(
+                    "UPDATE searches SET accessed = ? WHERE query = ? AND max_results = ?",
+                    (now, key, row[0])
+                )
+            self._db.commit()
+
+        if not row:
+            return None
+        try:
+            return json.loads(row[1])[:max_results]
+        except ValueError:
+            return None
+
+    def put(self, query:str, max_results:int, entries:list[dict]) -> None:
+        """Store the entries of a search and evict the least recently used ones."""
+        now = time.time()
+        try:
+            data = json.dumps(entries, default=str)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO searches (query, max_results, entries, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self._key(query), max_results, data, now, now)
+            )
+            self._db.execute(
+                "DELETE FROM searches WHERE rowid IN ("
+                "SELECT rowid FROM searches ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,10 +1,13 @@
 """search_file.py"""
 from sanitize_filename import sanitize
 from urllib.parse import urlparse
+from concurrent.futures import Future, ThreadPoolExecutor
 from fzf import fzf_select
 
 from player import Player
 from search import Search
+from download import DownloadPipeline
+from import_journal import ImportJournal
 
 import utils
 
@@ -19,9 +22,41 @@ class SearchFile(Search):
     .
     inputn
     """
-    def __init__(self, library, player:Player=Player(), playlist:str=None):
+    # queries searched concurrently ahead of the line being confirmed
+    _RESOLVE_AHEAD = 8
+
+    def __init__(self, library, player:Player|None=None, playlist:str=None):
         super().__init__(library, player, playlist)
 
+    @staticmethod
+    def _is_url(query:str) -> bool:
+        parsed = urlparse(query)
+        return bool(parsed.scheme and parsed.netloc)
+
+    def _resolve_ahead(self, resolver:ThreadPoolExecutor, searches:dict[int, Future], journal:ImportJournal, queries:list[str], line:int) -> None:
+        """Start searches for the lines in [line, line + _RESOLVE_AHEAD) that will need one."""
+        for i in range(line, min(line + self._RESOLVE_AHEAD, len(queries) + 1)):
+            query = queries[i - 1]
+            if i in searches or not query or self._is_url(query):
+                continue
+            entry = journal.entry(i, query)
+            if entry.get('url') or entry.get('state') in ImportJournal.DONE:
+                continue
+            searches[i] = resolver.submit(self._search, query, 1)
+
+    @staticmethod
+    def _journal_stage(journal:ImportJournal, line:int, query:str):
+        """Return a DownloadPipeline stage callback recording progress of a line."""
+        def on_stage(stage:str, detail:str|None) -> None:
+            match stage:
+                case 'downloaded':
+                    journal.update(line, query, ImportJournal.DOWNLOADED)
+                case 'processed':
+                    journal.update(line, query, ImportJournal.PROCESSED, path=detail)
+                case 'failed':
+                    journal.update(line, query, ImportJournal.FAILED, error=detail)
+        return on_stage
+
     def run(self):
         while True:
             try:
@@ -47,58 +82,105 @@ class SearchFile(Search):
             if not self.playlist:
                 break
 
+            journal = ImportJournal(filepath, self.playlist)
+            if journal.has_progress():
+                print("Resuming interrupted import.")
+
             print(f"Downloading {len(queries)} tracks to '{self.playlist}'...")
 
-            i = 1
-            for query in queries:
-                print()
-                if not query:
-                    print(f"Query {i} ('{query}') is invalid. Skipping.")
-                    continue
-
-                parsed = urlparse(query)
-                is_url = bool(parsed.scheme and parsed.netloc)
-                filename = ''
-                if is_url:
-                    # direct download without confirmation
-                    url = query
-                else:
-                    # otherwise manual confirmation is required
-                    entries = self.search_youtube(query, max_results=1)
-                    if not entries:
-                        print(f"No results for: {query} (line {i}). Skipping.")
-                        continue
-                    entry = entries[0]
-                    url = entry.get('webpage_url') or f"https://youtu.be/{entry['id']}"
-                    filename = sanitize(query) or sanitize(entry['title'])
-
-                    try:
-                        choice = fzf_select(
-                            ["yes", "no"],
-                            multi=False,
-                            prompt=f"Download result for {query}: {entry.get('title')} ({url}) ?",
-                            start_option="yes",
-                            raise_except=False
-                        )
-                    except (KeyboardInterrupt, EOFError):
-                        print("Downloads cancelled.")
-                        break
-                    except Exception as e:
-                        print(f"fzf selection failed: {e!s}. Skipping.")
-                        continue
-
-                    if not choice or choice[0] != "yes":
-                        print(f"Skipped: {query}")
-                        continue
-
-                saved = self.downloader.download_url(
-                    url,
-                    subfolder=self.playlist,
-                    filename=filename
-                )
-                
-                print(f"Saved: {saved}")
-                i += 1
+            # resolve queries ahead of the cursor and download confirmed lines in the
+            # background, so confirmations flow back-to-back
+            resolver = ThreadPoolExecutor(max_workers=self._RESOLVE_AHEAD)
+            searches: dict[int, Future] = {}
+            futures = []
+            try:
+                # downloads run while fzf is displayed: keep yt-dlp quiet
+                with DownloadPipeline(self.downloader, quiet=True) as pipeline:
+                    for i, query in enumerate(queries, 1):
+                        self._resolve_ahead(resolver, searches, journal, queries, i)
+
+                        entry = journal.entry(i, query)
+                        state = entry.get('state', ImportJournal.PENDING)
+                        if state in ImportJournal.DONE:
+                            continue
+                        if entry.get('url'):
+                            # confirmed by a previous run: no need to search or ask again
+                            futures.append(pipeline.submit(
+                                entry['url'], self.playlist, entry.get('filename', ''),
+                                on_stage=self._journal_stage(journal, i, query)
+                            ))
+                            continue
+
+                        print()
+                        if not query:
+                            print(f"Query {i} ('{query}') is invalid. Skipping.")
+                            continue
+
+                        filename = ''
+                        if self._is_url(query):
+                            # direct download without confirmation
+                            url = query
+                        else:
+                            # otherwise manual confirmation is required
+                            try:
+                                entries = searches.pop(i).result()
+                            except Exception as e:
+                                print(f"Search failed for: {query} (line {i}): {e!s}. Skipping.")
+                                continue
+                            if not entries:
+                                print(f"No results for: {query} (line {i}). Skipping.")
+                                journal.update(i, query, ImportJournal.SKIPPED)
+                                continue
+                            entry = entries[0]
+                            url = entry.get('webpage_url') or f"https://youtu.be/{entry['id']}"
+                            filename = sanitize(query) or sanitize(entry['title'])
+
+                            try:
+                                choice = fzf_select(
+                                    ["yes", "no"],
+                                    multi=False,
+                                    prompt=f"Download result for {query}: {entry.get('title')} ({url}) ?",
+                                    start_option="yes",
+                                    raise_except=False
+                                )
+                            except (KeyboardInterrupt, EOFError):
+                                print("Downloads cancelled.")
+                                pipeline.close(cancel=True)
+                                break
+                            except Exception as e:
+                                print(f"fzf selection failed: {e!s}. Skipping.")
+                                continue
+
+                            if not choice or choice[0] != "yes":
+                                print(f"Skipped: {query}")
+                                journal.update(i, query, ImportJournal.SKIPPED)
+                                continue
+
+                        journal.update(i, query, ImportJournal.RESOLVED, url=url, filename=filename)
+                        futures.append(pipeline.submit(
+                            url, self.playlist, filename,
+                            on_stage=self._journal_stage(journal, i, query)
+                        ))
+
+                    resolver.shutdown(wait=False, cancel_futures=True)
+                    if futures:
+                        print("Waiting for remaining download(s)...")
+            except KeyboardInterrupt:
+                # the pipeline dropped its pending jobs on exit; the journal resumes them
+                resolver.shutdown(wait=False, cancel_futures=True)
+                print("Downloads cancelled.")
+
+            # after a cancel, downloads still running are left to finish in the background
+            saved = [future.result() if future.done() else None for future in futures]
+            for path in saved:
+                if path:
+                    print(f"Saved: {path}")
+            not_saved = saved.count(None)
+            if not_saved:
+                print(f"Not saved (failed or cancelled): {not_saved}")
+
+            if journal.is_complete(len(queries)):
+                journal.remove()
 
             print("End of download(s).")
             input("Press Enter to continue...")
@@ -4,6 +4,10 @@ import configparser
 from pathlib import Path
 import platform
 import subprocess
+import threading
+import time
+
+import tracing
 
 def open_path(path: Path) -> None:
     """Open a directory or file with the system default application."""
@@ -45,10 +49,13 @@ class Settings():
             'settings_directory': 'False',
             'clear_screen': 'False',
             'debug': 'False',
+            'trace': 'False', # write a span trace and latency histogram on exit (also with debug)
         },
         'player': {
             'player_cmd': 'mpv',
-            'ipc_path': str(_CONFIG_DIR / 'ipc-socket')
+            'ipc_path': str(_CONFIG_DIR / 'ipc-socket'),
+            'prewarm': 'False',
+            'queue_window': '0', # tracks kept loaded ahead in mpv (0: whole playlist)
         },
         'library': {
             'root_path': str(Path.home() / 'Music'),
@@ -57,26 +64,57 @@ class Settings():
             'show_extensions': 'False',
             'sort_playlists_by': 'name',
             'sort_tracks_by': 'name',
+            'watch': 'True',
+        },
+        'search': {
+            'cache_ttl': '86400', # seconds
+            'cache_size': '500', # searches
         },
         'download': {
             'preferred_codec': 'flac',
             'preferred_quality': 'best',
             'embed_thumbnail': 'True',
+            'concurrency': '3',
         }
     }
 
     config = configparser.ConfigParser()
 
+    # parsed snapshot of the file, reloaded only when its mtime changes
+    _snapshot: dict[tuple[str, str], str] = {}
+    _typed: dict[tuple[str, str, type], object] = {} # cached bools and lists
+    _mtime_ns: int|None = None
+    _checked_at: float|None = None
+    _CHECK_INTERVAL = 1.0 # seconds between two mtime checks
+    _lock = threading.RLock()
+
     @classmethod
     def get_settings_path(cls):
         """Get settings configuration file's path."""
         return cls._FILE
 
+    @classmethod
+    def get_config_dir(cls) -> Path:
+        """Get the configuration directory (settings, caches, indexes)."""
+        return cls._CONFIG_DIR
+
     @classmethod
     def _save(cls):
         """Write the settings to disk."""
         with cls._FILE.open('w') as file:
             cls.config.write(file)
+        # our own write must not trigger a reload
+        cls._mtime_ns = cls._FILE.stat().st_mtime_ns
+
+    @classmethod
+    def _take_snapshot(cls):
+        """Rebuild the in-memory snapshot from the parsed configuration."""
+        cls._snapshot = {
+            (section, option): value
+            for section in cls.config.sections()
+            for option, value in cls.config.items(section)
+        }
+        cls._typed = {}
 
     @classmethod
     def _write_defaults(cls):
@@ -84,32 +122,53 @@ class Settings():
         for section, opts in cls._DEFAULTS.items():
             cls.config[section] = opts.copy()
         cls._save()
+        cls._take_snapshot()
 
     @classmethod
     def initialize(cls):
         """Load existing settings or write all defaults if missing/empty."""
-        if cls._FILE.exists():
-            cls.config.read(cls._FILE)
-            if not cls.config.sections():
+        with cls._lock:
+            cls._checked_at = time.monotonic()
+            try:
+                mtime_ns = cls._FILE.stat().st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = None
+
+            if mtime_ns is not None and mtime_ns == cls._mtime_ns:
+                return
+
+            cls.config = configparser.ConfigParser()
+            if mtime_ns is not None:
+                cls.config.read(cls._FILE)
+                cls._mtime_ns = mtime_ns
+                if not cls.config.sections():
+                    cls._write_defaults()
+            else:
                 cls._write_defaults()
-        else:
-            cls._write_defaults()
+            cls._take_snapshot()
 
     @classmethod
+    def _reload_if_changed(cls):
+        """Reload the snapshot if the file changed, checking its mtime at most once per interval."""
+        if cls._checked_at is None or time.monotonic() - cls._checked_at >= cls._CHECK_INTERVAL:
+            cls.initialize()
+
+    @classmethod
+    @tracing.traced("Settings.get")
     def get(cls, section:str, option:str) -> str:
         """Get a value from settings configuration, with fallback value."""
         # ensure overall initialization was done or update values
-        cls.initialize()
+        cls._reload_if_changed()
 
-        # if missing, set default and persist
-        if not cls.config.has_section(section) or not cls.config.has_option(section, option):
-            if not cls.config.has_section(section):
-                cls.config[section] = {}
-            cls.config[section][option] = cls._DEFAULTS[section][option]
-            cls._save()
-            return cls._DEFAULTS[section][option]
+        value = cls._snapshot.get((section, option))
+        if value is not None:
+            return value
 
-        return cls.config.get(section, option)
+        # if missing, set default and persist
+        with cls._lock:
+            default = cls._DEFAULTS[section][option]
+            cls.set(section, option, default)
+            return default
 
     @classmethod
     def ensure_bool_str(cls, value:str) -> None:
@@ -120,6 +179,11 @@ class Settings():
     @classmethod
     def get_bool(cls, section:str, option:str) -> bool:
         """Get a boolean value from settings configuration."""
+        cls._reload_if_changed()
+        cached = cls._typed.get((section, option, bool))
+        if cached is not None:
+            return cached
+
         value = cls.get(section, option)
         try:
             cls.ensure_bool_str(value)
@@ -128,15 +192,30 @@ class Settings():
                         f"Invalid boolean string for [{section}].{option}: {value!r}. "
                         "Expected 'True' or 'False'."
                         ) from e
+        cls._typed[(section, option, bool)] = value == "True"
         return value == "True"
 
+    @classmethod
+    def get_list(cls, section:str, option:str) -> tuple[str, ...]:
+        """Get a comma-separated value from settings configuration, pre-split."""
+        cls._reload_if_changed()
+        cached = cls._typed.get((section, option, tuple))
+        if cached is not None:
+            return cached
+
+        value = tuple(v.strip() for v in cls.get(section, option).split(',') if v.strip())
+        cls._typed[(section, option, tuple)] = value
+        return value
+
     @classmethod
     def set(cls, section:str, option:str, value:str) -> None:
         """Set a value to settings configuration."""
-        if not cls.config.has_section(section):
-            cls.config[section] = {}
-        cls.config[section][option] = value
-        cls._save()
+        with cls._lock:
+            if not cls.config.has_section(section):
+                cls.config[section] = {}
+            cls.config[section][option] = value
+            cls._save()
+            cls._take_snapshot()
 
     @classmethod
     def set_bool(cls, section:str, option:str, value:bool) -> None:
@@ -0,0 +1,96 @@
+"""stream_cache.py"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+from urllib.parse import urlparse, parse_qs
+
+
+def expiry_from_url(url:str) -> Optional[float]:
+    """Return the expiry timestamp embedded in a stream URL (e.g. googlevideo 'expire'), if any."""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+
+    value = (parse_qs(parsed.query).get('expire') or [None])[0]
+    if value is None:
+        # some URLs carry parameters as path segments: /expire/<ts>/...
+        parts = parsed.path.split('/')
+        if 'expire' in parts:
+            idx = parts.index('expire')
+            value = parts[idx + 1] if idx + 1 < len(parts) else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class StreamUrlCache:
+    """
+    In-memory cache of resolved stream URLs, valid until the expiry embedded
+    in the URL minus a safety margin. Resolutions can be started ahead of time
+    in the background; a get() for a video being resolved waits for it.
+    """
+
+    def __init__(self, margin:float=300.0, default_ttl:float=600.0, workers:int=3):
+        """
+        margin: seconds before the embedded expiry after which a URL is resolved again
+        default_ttl: lifetime of URLs without an embedded expiry
+        workers: background resolutions running at once
+        """
+        self.margin = margin
+        self.default_ttl = default_ttl
+        self.workers = workers
+
+        self._lock = threading.Lock()
+        self._urls: dict[str, tuple[str, float]] = {} # video id -> (url, valid until)
+        self._inflight: dict[str, Future] = {}
+        self._pool: ThreadPoolExecutor|None = None
+
+    def _valid_until(self, url:str) -> float:
+        expire = expiry_from_url(url)
+        if expire is None:
+            return time.time() + self.default_ttl
+        return expire - self.margin
+
+    def _cached(self, video_id:str) -> Optional[str]:
+        item = self._urls.get(video_id)
+        if item and item[1] > time.time():
+            return item[0]
+        self._urls.pop(video_id, None)
+        return None
+
+    def _resolve(self, video_id:str, resolver:Callable[[str], str]) -> str:
+        try:
+            url = resolver(video_id)
+            with self._lock:
+                self._urls[video_id] = (url, self._valid_until(url))
+            return url
+        finally:
+            with self._lock:
+                self._inflight.pop(video_id, None)
+
+    def get(self, video_id:str, resolver:Callable[[str], str]) -> str:
+        """Return a valid stream URL, resolving it with resolver(video_id) if needed."""
+        with self._lock:
+            url = self._cached(video_id)
+            if url:
+                return url
+            future = self._inflight.get(video_id)
+        if future:
+            try:
+                return future.result()
+            except Exception:
+                pass # resolve again in the foreground, raising its error
+        return self._resolve(video_id, resolver)
+
+    def prefetch(self, video_ids:list[str], resolver:Callable[[str], str]) -> None:
+        """Resolve stream URLs in the background so a later get() returns at once."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            for video_id in video_ids:
+                if not video_id or video_id in self._inflight or self._cached(video_id):
+                    continue
+                self._inflight[video_id] = self._pool.submit(self._resolve, video_id, resolver)
@@ -0,0 +1,177 @@
+"""tracing.py"""
+import functools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+
+class Tracer:
+    """
+    Collects timed spans of the hot paths.
+
+    Spans are kept as Chrome trace events (viewable in chrome://tracing or
+    ui.perfetto.dev) up to max_events; every span is also aggregated into a
+    per-name latency histogram (power-of-two microsecond buckets).
+
+    Nothing here reads Settings, whose own lookups are traced.
+    """
+
+    def __init__(self, max_events:int=200_000):
+        """
+        max_events: spans kept for the trace file; later ones only count in the histogram
+        """
+        self.max_events = max_events
+        self.dropped = 0
+
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._events: list[dict] = []
+        self._threads: dict[int, str] = {}
+        self._stats: dict[str, list] = {} # name -> [count, total_us, max_us, {bucket: count}]
+
+    def record(self, name:str, start_ns:int, end_ns:int, args:Optional[dict]=None) -> None:
+        start_us = (start_ns - self._origin) / 1000
+        dur_us = (end_ns - start_ns) / 1000
+        bucket = 1 << int(dur_us).bit_length() # power of two above the duration
+        tid = threading.get_ident()
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = [0, 0.0, 0.0, {}]
+            stats[0] += 1
+            stats[1] += dur_us
+            stats[2] = max(stats[2], dur_us)
+            stats[3][bucket] = stats[3].get(bucket, 0) + 1
+
+            if len(self._events) >= self.max_events:
+                self.dropped += 1
+                return
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+            event = {"name": name, "ph": "X", "ts": start_us, "dur": dur_us, "pid": os.getpid(), "tid": tid}
+            if args:
+                event["args"] = args
+            self._events.append(event)
+
+    def histogram(self) -> dict:
+        """Return count, total, max and approximate percentiles (in ms) of every span name."""
+        with self._lock:
+            stats = {name: (s[0], s[1], s[2], dict(s[3])) for name, s in self._stats.items()}
+
+        result = {}
+        for name, (count, total_us, max_us, buckets) in sorted(stats.items(), key=lambda kv: -kv[1][1]):
+            def percentile(p:float) -> float:
+                seen = 0
+                for bound in sorted(buckets):
+                    seen += buckets[bound]
+                    if seen >= p * count:
+                        return min(bound, max_us) / 1000
+                return max_us / 1000
+            result[name] = {
+                "count": count,
+                "total_ms": total_us / 1000,
+                "max_ms": max_us / 1000,
+                "p50_ms": percentile(0.5),
+                "p90_ms": percentile(0.9),
+                "p99_ms": percentile(0.99),
+                "buckets_us": {f"<{bound}": n for bound, n in sorted(buckets.items())},
+            }
+        return result
+
+    def write(self, directory:Path) -> tuple[Path, Path]:
+        """Write the Chrome trace and the histogram into directory; returns both paths."""
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        trace_path = directory / f"trace-{stamp}-{os.getpid()}.json"
+        histogram_path = directory / f"latency-{stamp}-{os.getpid()}.json"
+
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        with trace_path.open("w", encoding="utf-8") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms",
+                       "otherData": {"dropped_spans": self.dropped}}, f)
+        with histogram_path.open("w", encoding="utf-8") as f:
+            json.dump(self.histogram(), f, indent=1)
+        return trace_path, histogram_path
+
+
+# the active tracer, None while tracing is disabled
+_tracer: Optional[Tracer] = None
+
+
+def enable(max_events:int=200_000) -> Tracer:
+    """Start recording spans (idempotent)."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(max_events)
+    return _tracer
+
+
+def disable() -> Optional[Tracer]:
+    """Stop recording and return the tracer holding what was recorded."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def is_enabled() -> bool:
+    return _tracer is not None
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name:str, args:Optional[dict]):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        tracer = _tracer
+        if tracer is not None:
+            tracer.record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name:str, **args):
+    """Context manager timing a block; costs next to nothing while tracing is disabled."""
+    if _tracer is None:
+        return _NO_SPAN
+    return _Span(name, args or None)
+
+
+def traced(name:str) -> Callable:
+    """Decorator timing every call of a function as a span."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _Span(name, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
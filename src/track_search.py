@@ -0,0 +1,183 @@
+"""track_search.py"""
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+from library_index import LibraryIndex
+from metadata import MetadataCache, TrackMetadata
+
+
+class TrackHit(NamedTuple):
+    """A track matching a full-text query."""
+    playlist: str
+    name: str
+
+
+class TrackSearch:
+    """
+    Full-text index (SQLite FTS5) of the tracks of every playlist, over
+    filenames and tags.
+
+    The index follows the LibraryIndex: sync() only touches tracks added,
+    changed or removed since the previous sync. Tags come from the
+    MetadataCache; tracks whose tags were never read are indexed by name
+    first and get their tags from tag_missing().
+    """
+
+    _SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS track_fts USING fts5 (
+            name, artist, album, title,
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+        CREATE TABLE IF NOT EXISTS track_fts_state (
+            id INTEGER PRIMARY KEY, -- rowid in track_fts
+            playlist TEXT NOT NULL,
+            name TEXT NOT NULL,
+            mtime INTEGER NOT NULL,
+            ext TEXT NOT NULL,
+            tagged INTEGER NOT NULL,
+            UNIQUE (playlist, name)
+        );
+    """
+
+    def __init__(self, db_path:Path, library_index:LibraryIndex, metadata:MetadataCache):
+        """
+        db_path: sqlite database file holding the index (the one of library_index)
+        library_index: index of the library files
+        metadata: cache the tags are taken from
+        """
+        self.db_path = db_path
+        self.library_index = library_index
+        self.metadata = metadata
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._db.executescript(self._SCHEMA)
+        self._synced_version: int|None = None
+
+    @staticmethod
+    def available() -> bool:
+        """Return True if this sqlite build has FTS5."""
+        try:
+            db = sqlite3.connect(':memory:')
+            db.execute("CREATE VIRTUAL TABLE t USING fts5 (x)")
+            db.close()
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def _path(self, playlist:str, name:str) -> str:
+        return os.path.join(self.library_index.root_path, playlist, name)
+
+    def sync(self) -> None:
+        """Bring the index up to date with the tracks table of the library index."""
+        with self._lock:
+            # data_version only changes when another connection (e.g. the
+            # library index) commits: nothing to diff otherwise
+            version = self._db.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._synced_version:
+                return
+            self._synced_version = version
+
+            # both tables live in the library database: diff them in sqlite
+            stale_ids = [r[0] for r in self._db.execute(
+                "SELECT s.id FROM track_fts_state s "
+                "LEFT JOIN tracks t ON t.playlist = s.playlist AND t.name = s.name "
+                "WHERE t.name IS NULL OR t.mtime != s.mtime"
+            )]
+            changed = self._db.execute(
+                "SELECT t.playlist, t.name, t.mtime, t.ext FROM tracks t "
+                "LEFT JOIN track_fts_state s ON s.playlist = t.playlist AND s.name = t.name "
+                "WHERE s.id IS NULL OR s.mtime != t.mtime"
+            ).fetchall()
+            if not stale_ids and not changed:
+                return
+
+            self._db.executemany("DELETE FROM track_fts WHERE rowid = ?", [(i,) for i in stale_ids])
+            self._db.executemany("DELETE FROM track_fts_state WHERE id = ?", [(i,) for i in stale_ids])
+
+            tags = self.metadata.get_cached() if changed else {}
+            for playlist, name, mtime, ext in changed:
+                cached = tags.get(self._path(playlist, name))
+                tagged = cached is not None and cached[0] == mtime
+                md = cached[1] if tagged else TrackMetadata()
+                cur = self._db.execute(
+                    "INSERT INTO track_fts (name, artist, album, title) VALUES (?, ?, ?, ?)",
+                    (os.path.splitext(name)[0], md.artist or '', md.album or '', md.title or '')
+                )
+                self._db.execute(
+                    "INSERT INTO track_fts_state (id, playlist, name, mtime, ext, tagged) VALUES (?, ?, ?, ?, ?, ?)",
+                    (cur.lastrowid, playlist, name, mtime, ext, int(tagged))
+                )
+            self._db.commit()
+
+    def tag_missing(self, batch:int=500) -> None:
+        """Read the tags of indexed tracks that have none yet (slow: opens the files)."""
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT id, playlist, name, mtime FROM track_fts_state WHERE tagged = 0 LIMIT ?", (batch,)
+                ).fetchall()
+            if not rows:
+                return
+
+            files = []
+            for _, playlist, name, mtime in rows:
+                path = self._path(playlist, name)
+                try:
+                    size = os.stat(path).st_size
+                except OSError:
+                    size = -1
+                files.append((path, mtime, size))
+            meta = self.metadata.get_many(files)
+
+            with self._lock:
+                for (rowid, playlist, name, _), (path, _, _) in zip(rows, files):
+                    md = meta.get(path)
+                    if md is None:
+                        continue
+                    self._db.execute(
+                        "UPDATE track_fts SET artist = ?, album = ?, title = ? WHERE rowid = ?",
+                        (md.artist, md.album, md.title, rowid)
+                    )
+                # marked even without tags, so unreadable files are not retried
+                self._db.executemany("UPDATE track_fts_state SET tagged = 1 WHERE id = ?", [(r[0],) for r in rows])
+                self._db.commit()
+
+    @staticmethod
+    def _match_query(text:str) -> str:
+        """Turn user input into an FTS5 query: every word, as a prefix, in any column."""
+        words = text.split()
+        return " ".join('"' + w.replace('"', '""') + '"*' for w in words)
+
+    def search(self, text:str, formats:list[str]|None=None, hidden:bool=False, limit:int=500) -> list[TrackHit]:
+        """
+        Return the tracks best matching text, optionally restricted to extensions.
+        Tracks of hidden playlists are only included with hidden.
+        """
+        query = self._match_query(text)
+        if not query:
+            return []
+        sql = (
+            "SELECT s.playlist, s.name FROM track_fts "
+            "JOIN track_fts_state s ON s.id = track_fts.rowid "
+            "WHERE track_fts MATCH ?"
+        )
+        args = [query]
+        if formats is not None:
+            formats = [f.strip().lower() for f in formats]
+            sql += f" AND s.ext IN ({','.join('?' * len(formats))})"
+            args += formats
+        if not hidden:
+            # filtered before LIMIT, so hidden tracks never crowd out visible ones
+            sql += " AND s.playlist NOT LIKE '.%'"
+        sql += " ORDER BY rank LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return [TrackHit(*r) for r in self._db.execute(sql, args)]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,202 @@
+"""watcher.py"""
+import os
+import threading
+
+from library_index import LibraryIndex
+from inotify import (
+    Inotify, IN_ATTRIB, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE,
+    IN_DELETE_SELF, IN_MOVE_SELF, IN_Q_OVERFLOW, IN_IGNORED, IN_ONLYDIR, IN_ISDIR
+)
+
+
+class LibraryWatcher:
+    """
+    Background watcher of the library root and its playlist directories.
+
+    On Linux, inotify events are applied as deltas to the LibraryIndex so
+    menus can be served without rescanning. Elsewhere (or if inotify is not
+    usable) the index is refreshed by polling directory mtimes.
+    """
+
+    _ROOT_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+    _PLAYLIST_MASK = IN_CREATE | IN_CLOSE_WRITE | IN_ATTRIB | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR
+
+    def __init__(self, index:LibraryIndex, poll_interval:float=2.0):
+        """
+        index: library index receiving the changes
+        poll_interval: seconds between refreshes when inotify is unavailable
+        """
+        self.index = index
+        self.poll_interval = poll_interval
+
+        self._thread: threading.Thread|None = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._dirty = False # a delta could not be applied: the index needs a full refresh
+
+        self._inotify: Inotify|None = None
+        self._root_wd: int|None = None
+        self._wd_playlists: dict[int, str] = {}
+        self._playlist_wds: dict[str, int] = {}
+
+    def start(self) -> None:
+        """Start watching in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+
+    def is_live(self) -> bool:
+        """Return True once the index is kept up to date in the background."""
+        return self._ready.is_set() and bool(self._thread and self._thread.is_alive())
+
+    # -------------------------
+    # loops
+    # -------------------------
+    def _run(self) -> None:
+        try:
+            self._inotify = Inotify()
+        except OSError:
+            self._inotify = None
+
+        try:
+            if self._inotify:
+                self._inotify_loop()
+            else:
+                self._poll_loop()
+        finally:
+            self._ready.clear()
+            if self._inotify:
+                self._inotify.close()
+                self._inotify = None
+
+    def _poll_loop(self, until_root:bool=False) -> None:
+        """Refresh the index periodically until stop(), or until the root exists with until_root."""
+        while not self._stop.is_set():
+            if until_root and os.path.isdir(self.index.root_path):
+                return
+            try:
+                self.index.refresh()
+                self._ready.set()
+            except Exception:
+                self._ready.clear()
+            self._stop.wait(self.poll_interval)
+
+    def _inotify_loop(self) -> None:
+        self._resync()
+        while not self._stop.is_set():
+            try:
+                events = self._inotify.read(timeout=0.5)
+            except OSError:
+                return
+            for wd, mask, _, name in events:
+                try:
+                    self._handle(wd, mask, name)
+                except Exception:
+                    # e.g. the database stayed locked: the delta is lost, so
+                    # menus rescan by themselves until the index is rebuilt
+                    self._dirty = True
+                    self._ready.clear()
+            if self._dirty:
+                self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Rescan the whole library after lost deltas; retried on the next wakeup if it fails."""
+        try:
+            self.index.refresh(force=True)
+        except Exception:
+            return
+        self._dirty = False
+        self._ready.set()
+
+    def _resync(self) -> None:
+        """(Re)install watches, then bring the index up to date."""
+        while True:
+            for wd in list(self._wd_playlists):
+                self._inotify.rm_watch(wd)
+            self._wd_playlists.clear()
+            self._playlist_wds.clear()
+            if self._root_wd is not None:
+                # already gone if the root was deleted or moved
+                self._inotify.rm_watch(self._root_wd)
+                self._root_wd = None
+
+            try:
+                self._root_wd = self._inotify.add_watch(self.index.root_path, self._ROOT_MASK)
+                break
+            except OSError:
+                # root missing: fall back to polling until it shows up, then watch it
+                self._poll_loop(until_root=True)
+                if self._stop.is_set():
+                    return
+
+        # watch first so nothing happening during the refresh is missed
+        try:
+            with os.scandir(self.index.root_path) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        self._watch_playlist(entry.name)
+        except OSError:
+            pass
+        try:
+            self.index.refresh()
+        except Exception:
+            # e.g. a locked database: rebuilt from the event loop
+            self._dirty = True
+            self._ready.clear()
+            return
+        self._ready.set()
+
+    def _watch_playlist(self, playlist:str) -> None:
+        try:
+            wd = self._inotify.add_watch(os.path.join(self.index.root_path, playlist), self._PLAYLIST_MASK)
+        except OSError:
+            return
+        self._wd_playlists[wd] = playlist
+        self._playlist_wds[playlist] = wd
+
+    def _unwatch_playlist(self, playlist:str) -> None:
+        wd = self._playlist_wds.pop(playlist, None)
+        if wd is not None:
+            self._wd_playlists.pop(wd, None)
+            self._inotify.rm_watch(wd)
+
+    # -------------------------
+    # event handling
+    # -------------------------
+    def _handle(self, wd:int, mask:int, name:str) -> None:
+        if mask & IN_Q_OVERFLOW:
+            self._resync()
+            return
+        if mask & IN_IGNORED:
+            playlist = self._wd_playlists.pop(wd, None)
+            if playlist is not None:
+                self._playlist_wds.pop(playlist, None)
+            return
+
+        if wd == self._root_wd:
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self._ready.clear()
+                self._resync()
+            elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_playlist(name)
+                self.index.add_playlist(name)
+            elif mask & IN_ISDIR and mask & (IN_DELETE | IN_MOVED_FROM):
+                self._unwatch_playlist(name)
+                self.index.remove_playlist(name)
+            return
+
+        playlist = self._wd_playlists.get(wd)
+        if playlist is None or mask & IN_ISDIR:
+            return
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            self.index.remove_track(playlist, name)
+        elif mask & (IN_CREATE | IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_TO):
+            self.index.add_track(playlist, name)
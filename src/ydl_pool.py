@@ -0,0 +1,123 @@
+"""ydl_pool.py"""
+import copy
+import json
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+_UNSET = object()
+
+
+class YoutubeDLPool:
+    """
+    Pool of initialised yt_dlp.YoutubeDL instances, keyed by option profile.
+
+    Building a YoutubeDL parses its options, loads the extractors and sets up
+    an HTTP session; reusing instances keeps that (and open connections)
+    across calls. Each borrowed instance is used by one thread at a time.
+    """
+
+    # options that can change between calls without a new instance
+    PER_CALL = ('outtmpl', 'paths', 'quiet', 'noprogress')
+
+    def __init__(self, max_idle:int=4):
+        """
+        max_idle: instances kept per profile while not borrowed
+        """
+        self.max_idle = max_idle
+
+        self._lock = threading.Lock()
+        self._idle: dict[str, list] = {} # profile key -> idle instances
+        self._stats = {'hits': 0, 'misses': 0, 'discarded': 0}
+
+    @classmethod
+    def _base(cls, opts:dict) -> dict:
+        return {k: v for k, v in opts.items() if k not in cls.PER_CALL}
+
+    @classmethod
+    def _key(cls, profile:str, opts:dict) -> str:
+        return profile + '\0' + json.dumps(cls._base(opts), sort_keys=True, default=repr)
+
+    @staticmethod
+    def _apply(ydl, overrides:dict) -> dict:
+        """Set per-call options; returns what restores the previous params."""
+        saved = {k: copy.copy(ydl.params[k]) if k in ydl.params else _UNSET for k in overrides}
+        for k, v in overrides.items():
+            if k == 'outtmpl' and not isinstance(v, dict):
+                # keep the default templates yt-dlp filled in for the other keys
+                v = {**ydl.params.get('outtmpl', {}), 'default': v}
+            ydl.params[k] = v
+        return saved
+
+    @staticmethod
+    def _restore(ydl, saved:dict) -> None:
+        for k, v in saved.items():
+            if v is _UNSET:
+                ydl.params.pop(k, None)
+            else:
+                ydl.params[k] = v
+
+    @contextmanager
+    def borrow(self, profile:str, opts:dict) -> Iterator:
+        """
+        Yield a YoutubeDL built from opts, reused from the pool when one with
+        the same profile and options is idle. Per-call options (PER_CALL) are
+        applied to the borrowed instance for this call only. An instance
+        whose call raised is not returned to the pool.
+        """
+        key = self._key(profile, opts)
+        overrides = {k: opts[k] for k in self.PER_CALL if k in opts}
+
+        with self._lock:
+            idle = self._idle.get(key)
+            ydl = idle.pop() if idle else None
+            self._stats['hits' if ydl else 'misses'] += 1
+
+        if ydl is None:
+            import yt_dlp # heavy: loaded on first use
+            # built without per-call options, so none outlive this call
+            ydl = yt_dlp.YoutubeDL(self._base(opts))
+        saved = self._apply(ydl, overrides)
+
+        try:
+            yield ydl
+        except BaseException:
+            self._discard(ydl)
+            raise
+        finally:
+            self._restore(ydl, saved)
+
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(ydl)
+                return
+        self._discard(ydl)
+
+    def _discard(self, ydl) -> None:
+        with self._lock:
+            self._stats['discarded'] += 1
+        try:
+            ydl.close()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the number of idle instances."""
+        with self._lock:
+            return dict(self._stats, idle=sum(len(v) for v in self._idle.values()))
+
+    def close(self) -> None:
+        """Close every idle instance."""
+        with self._lock:
+            instances = [ydl for idle in self._idle.values() for ydl in idle]
+            self._idle.clear()
+        for ydl in instances:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+
+
+# shared by Search and Download
+pool = YoutubeDLPool()